@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai des extracteurs PDF sur un dossier local.
+
+Chaque extracteur installé (pypdf2, pdfplumber, pypdfium2, pymupdf) traite
+tous les PDF du dossier dans un processus neuf, pour mesurer :
+- la vitesse (pages/s, meilleur de --repeat passages)
+- le pic mémoire (RSS du processus, au-delà de l'interpréteur nu)
+- le rendement texte (caractères par page, pages vides, score de qualité)
+
+Usage :
+    python benchmark_pdf.py mes_documents
+    python benchmark_pdf.py mes_documents --backends pypdf2,pymupdf --repeat 3
+
+Le plus rapide des extracteurs "acceptables" (score >= --min-quality du
+meilleur, sans erreur) est proposé pour la variable PDF_BACKEND.
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from queue import Empty
+
+from services.pdf_extractor import BACKENDS, MIN_CHARS_PER_PAGE, available_backends, text_quality
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus courant (Mo)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kio sous Linux, octets sous macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_backend(backend: str, paths: list, repeat: int) -> dict:
+    """Extraire tous les PDF avec un extracteur (dans un processus dédié)"""
+    baseline = peak_rss_mb()
+    extract = BACKENDS[backend]
+    best = None
+    pages, errors = [], []
+    for _ in range(repeat):
+        pages, errors = [], []
+        start = time.perf_counter()
+        for path in paths:
+            try:
+                file_pages, _ = extract(path, 0, None)
+                pages.extend(file_pages)
+            except Exception as e:
+                errors.append(f"{os.path.basename(path)}: {e}")
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    chars = sum(len(page.strip()) for page in pages)
+    return {
+        'backend': backend,
+        'pages': len(pages),
+        'seconds': best,
+        'pages_per_second': len(pages) / best if best else 0.0,
+        'memory_mb': max(0.0, peak_rss_mb() - baseline),
+        'chars_per_page': chars / max(1, len(pages)),
+        'empty_pages': sum(1 for page in pages if len(page.strip()) < MIN_CHARS_PER_PAGE),
+        'quality': text_quality(pages),
+        'errors': errors
+    }
+
+
+def _worker(backend, paths, repeat, queue):
+    queue.put(run_backend(backend, paths, repeat))
+
+
+def _failure(backend: str, error: str) -> dict:
+    """Résultat d'un extracteur dont le processus n'a rien renvoyé"""
+    return {
+        'backend': backend, 'pages': 0, 'seconds': 0.0, 'pages_per_second': 0.0,
+        'memory_mb': 0.0, 'chars_per_page': 0.0, 'empty_pages': 0, 'quality': 0.0,
+        'errors': [error]
+    }
+
+
+def benchmark(backend: str, paths: list, repeat: int, timeout: float = 0) -> dict:
+    """Lancer ``run_backend`` dans un processus neuf (mémoire mesurée à part).
+
+    Un processus mort (segfault, mémoire) ou qui dépasse ``timeout`` secondes
+    (0 = sans limite) donne un résultat en erreur au lieu de bloquer.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_worker, args=(backend, paths, repeat, queue))
+    process.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while True:
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                pass
+            if not process.is_alive():
+                # Le résultat a pu être envoyé juste avant la fin du processus
+                try:
+                    return queue.get(timeout=1)
+                except Empty:
+                    return _failure(backend, f"processus arrêté sans résultat (code {process.exitcode})")
+            if deadline is not None and time.monotonic() > deadline:
+                process.terminate()
+                return _failure(backend, f"délai de {timeout:g} s dépassé")
+    finally:
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les extracteurs PDF sur un dossier")
+    parser.add_argument('folder', help="Dossier contenant les PDF")
+    parser.add_argument('--backends', help="Extracteurs séparés par des virgules (défaut : tous ceux installés)")
+    parser.add_argument('--repeat', type=int, default=1, help="Passages par extracteur (le meilleur temps est gardé)")
+    parser.add_argument('--min-quality', type=float, default=0.9,
+                        help="Score minimal, en fraction du meilleur, pour être acceptable")
+    parser.add_argument('--timeout', type=float, default=0,
+                        help="Durée maximale par extracteur en secondes (défaut : sans limite)")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder)
+        if name.lower().endswith('.pdf')
+    )
+    if not paths:
+        print(f"❌ Aucun PDF dans {args.folder}")
+        sys.exit(1)
+
+    installed = available_backends()
+    backends = [name.strip() for name in args.backends.split(',')] if args.backends else installed
+    for name in backends:
+        if name not in installed:
+            print(f"❌ Extracteur {name} non installé (installés : {', '.join(installed)})")
+            sys.exit(1)
+
+    print(f"📚 {len(paths)} PDF, extracteurs : {', '.join(backends)}\n")
+    results = []
+    for name in backends:
+        print(f"⏳ {name}...")
+        results.append(benchmark(name, paths, max(1, args.repeat), args.timeout))
+
+    print()
+    print(f"{'Extracteur':<12} {'Pages':>6} {'Temps (s)':>10} {'Pages/s':>9} {'Mémoire (Mo)':>13} "
+          f"{'Car./page':>10} {'Vides':>6} {'Qualité':>8}")
+    for result in results:
+        print(
+            f"{result['backend']:<12} {result['pages']:>6} {result['seconds']:>10.2f} "
+            f"{result['pages_per_second']:>9.1f} {result['memory_mb']:>13.1f} "
+            f"{result['chars_per_page']:>10.0f} {result['empty_pages']:>6} {result['quality']:>8.0f}"
+        )
+        for error in result['errors']:
+            print(f"   ⚠️ {error}")
+
+    best_quality = max(result['quality'] for result in results)
+    acceptable = [
+        result for result in results
+        if not result['errors'] and result['quality'] >= best_quality * args.min_quality
+    ]
+    if not acceptable:
+        print("\n⚠️ Aucun extracteur acceptable (erreurs ou texte absent : PDF scannés ?)")
+        return
+    fastest = max(acceptable, key=lambda result: result['pages_per_second'])
+    print(f"\n✅ Extracteur conseillé : PDF_BACKEND={fastest['backend']}")
+
+
+if __name__ == "__main__":
+    main()
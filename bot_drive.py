@@ -5,6 +5,7 @@ Bot Telegram avec Google Drive - Version simple pour commencer
 
 import os
 import pickle
+import asyncio
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from mistralai import Mistral
@@ -12,9 +13,12 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-import PyPDF2
 import io
 from dotenv import load_dotenv
+from services.document_store import Document, DocumentStore
+from services.pdf_extractor import PdfExtractor
+from services.text_cache import ExtractedTextCache
+from config import Config
 
 # Charger les variables
 load_dotenv()
@@ -23,6 +27,7 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 MISTRAL_KEY = os.getenv("MISTRAL_API_KEY")
 DRIVE_FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
+PDF_BACKEND = Config.PDF_BACKEND  # Réglage commun (config.py) : auto, pypdf2, pdfplumber, pypdfium2 ou pymupdf
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
 # Vérifier la config
@@ -34,7 +39,8 @@ if not TELEGRAM_TOKEN or not MISTRAL_KEY:
 mistral_client = Mistral(api_key=MISTRAL_KEY)
 
 # Documents en mémoire
-documents_cache = {}
+documents_cache = DocumentStore()
+pdf_extractor = PdfExtractor(cache=ExtractedTextCache(), backend=PDF_BACKEND)
 
 def get_drive_service():
     """Obtenir le service Google Drive"""
@@ -89,11 +95,11 @@ async def sync_drive(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔄 Synchronisation en cours...")
     
     try:
-        # Lister les fichiers PDF
-        results = drive_service.files().list(
+        # Lister les fichiers PDF (appel HTTP bloquant : dans un thread)
+        results = await asyncio.to_thread(drive_service.files().list(
             q=f"'{DRIVE_FOLDER_ID}' in parents and mimeType='application/pdf'",
             fields="files(id, name)"
-        ).execute()
+        ).execute)
         
         files = results.get('files', [])
         
@@ -101,8 +107,21 @@ async def sync_drive(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("📂 Aucun PDF trouvé dans le dossier")
             return
         
-        # Charger chaque PDF
-        loaded = 0
+        # Extraire le texte d'un PDF sur le pool de processus
+        async def parse(file, file_data):
+            try:
+                # Normalisation et indexation hors de la boucle d'événements
+                await documents_cache.add(file['name'], Document.from_pages(
+                    await pdf_extractor.extract_pages(file_data.getvalue())
+                ))
+                return True
+            except Exception as e:
+                print(f"Erreur avec {file['name']}: {e}")
+                return False
+        
+        # Charger chaque PDF : le parsing d'un fichier se fait pendant
+        # le téléchargement des suivants
+        parse_tasks = []
         for file in files:
             try:
                 # Télécharger le fichier
@@ -112,23 +131,15 @@ async def sync_drive(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 
                 done = False
                 while not done:
-                    status, done = downloader.next_chunk()
+                    status, done = await asyncio.to_thread(downloader.next_chunk)
                 
-                # Extraire le texte
-                file_data.seek(0)
-                pdf_reader = PyPDF2.PdfReader(file_data)
-                text = ""
-                
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                
-                # Stocker en cache
-                documents_cache[file['name']] = text
-                loaded += 1
+                parse_tasks.append(asyncio.create_task(parse(file, file_data)))
                 
             except Exception as e:
                 print(f"Erreur avec {file['name']}: {e}")
         
+        loaded = sum(await asyncio.gather(*parse_tasks))
+        
         await update.message.reply_text(
             f"✅ Synchronisation terminée !\n"
             f"📚 {loaded} documents chargés"
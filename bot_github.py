@@ -4,13 +4,14 @@ Bot Telegram qui lit des documents depuis GitHub - SUPER SIMPLE !
 """
 
 import os
-import requests
-import base64
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from mistralai import Mistral
-import PyPDF2
-import io
+from services.document_store import DocumentStore
+from services.github_sync import GitHubSync, GitHubSyncError
+from services.pdf_extractor import PdfExtractor
+from services.text_cache import ExtractedTextCache
+from config import Config
 from dotenv import load_dotenv
 
 # Charger les variables
@@ -21,6 +22,8 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 MISTRAL_KEY = os.getenv("MISTRAL_API_KEY")
 GITHUB_REPO = os.getenv("GITHUB_REPO", "ton-username/mes-cours")  # Format: username/repo
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")  # Optionnel, pour repos privés
+GITHUB_BRANCH = os.getenv("GITHUB_BRANCH", "main")
+PDF_BACKEND = Config.PDF_BACKEND  # Réglage commun (config.py) : auto, pypdf2, pdfplumber, pypdfium2 ou pymupdf
 
 # Vérifier la config
 if not TELEGRAM_TOKEN or not MISTRAL_KEY:
@@ -31,7 +34,12 @@ if not TELEGRAM_TOKEN or not MISTRAL_KEY:
 mistral_client = Mistral(api_key=MISTRAL_KEY)
 
 # Cache des documents
-documents_cache = {}
+documents_cache = DocumentStore()
+github_sync = GitHubSync(
+    GITHUB_REPO, GITHUB_TOKEN,
+    extractor=PdfExtractor(cache=ExtractedTextCache(), backend=PDF_BACKEND),
+    branch=GITHUB_BRANCH
+)
 
 # Commande /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -94,55 +102,22 @@ async def sync_github(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"🔄 Synchronisation avec GitHub ({GITHUB_REPO})...")
     
     try:
-        # Headers pour l'API GitHub
-        headers = {
-            "Accept": "application/vnd.github.v3+json"
-        }
-        if GITHUB_TOKEN:
-            headers["Authorization"] = f"token {GITHUB_TOKEN}"
-        
-        # Récupérer la liste des fichiers
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/contents"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
+        # Seuls les fichiers ajoutés ou modifiés depuis la dernière synchro
+        # sont retéléchargés
+        try:
+            result = await github_sync.sync(documents_cache)
+        except GitHubSyncError as e:
             await update.message.reply_text(
-                f"❌ Erreur GitHub : {response.status_code}\n"
+                f"❌ Erreur GitHub : {e.status_code}\n"
                 "Vérifie que le repo existe et est accessible !"
             )
             return
         
-        files = response.json()
-        loaded = 0
-        
-        # Charger chaque fichier
-        for file in files:
-            # On prend que les PDF et TXT
-            if file['name'].endswith(('.pdf', '.txt', '.md')):
-                try:
-                    # Télécharger le fichier
-                    file_response = requests.get(file['download_url'])
-                    
-                    if file['name'].endswith('.pdf'):
-                        # Lire le PDF
-                        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_response.content))
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                    else:
-                        # Fichier texte
-                        text = file_response.text
-                    
-                    # Stocker en cache
-                    documents_cache[file['name']] = text
-                    loaded += 1
-                    
-                except Exception as e:
-                    print(f"Erreur avec {file['name']}: {e}")
-        
         await update.message.reply_text(
             f"✅ Synchronisation terminée !\n"
-            f"📚 {loaded} documents chargés\n"
+            f"📚 {len(documents_cache)} documents chargés "
+            f"({len(result['added']) + len(result['updated'])} mis à jour, "
+            f"{len(result['deleted'])} supprimés)\n"
             f"Utilise /list pour voir les documents"
         )
         
@@ -227,7 +202,7 @@ def main():
     # Ajouter les commandes
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_github))
-    app.add_handler(CommandHandler("sync", sync_github))
+    app.add_handler(CommandHandler("sync", sync_github, block=False))
     app.add_handler(CommandHandler("list", list_docs))
     
     # Messages texte
@@ -4,11 +4,16 @@ Bot Telegram qui lit des documents depuis un dossier local
 """
 
 import os
+import asyncio
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from mistralai import Mistral
-import PyPDF2
 from dotenv import load_dotenv
+from services.document_store import DocumentStore
+from services.local_sync import LocalFolderSync
+from services.pdf_extractor import PdfExtractor
+from services.text_cache import ExtractedTextCache
+from config import Config
 
 # Charger les variables
 load_dotenv()
@@ -17,6 +22,8 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 MISTRAL_KEY = os.getenv("MISTRAL_API_KEY")
 DOCS_FOLDER = "mes_documents"  # Dossier local avec tes fichiers
+WATCH_INTERVAL_SECONDS = float(os.getenv("WATCH_INTERVAL_SECONDS", "5"))  # 0 = pas de surveillance
+PDF_BACKEND = Config.PDF_BACKEND  # Réglage commun (config.py) : auto, pypdf2, pdfplumber, pypdfium2 ou pymupdf
 
 # Créer le dossier s'il n'existe pas
 os.makedirs(DOCS_FOLDER, exist_ok=True)
@@ -25,7 +32,9 @@ os.makedirs(DOCS_FOLDER, exist_ok=True)
 mistral_client = Mistral(api_key=MISTRAL_KEY)
 
 # Cache des documents
-documents_cache = {}
+documents_cache = DocumentStore()
+pdf_extractor = PdfExtractor(cache=ExtractedTextCache(), backend=PDF_BACKEND)
+local_sync = LocalFolderSync(DOCS_FOLDER, extractor=pdf_extractor)
 
 # Commande /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -35,7 +44,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📁 Mets tes PDF/TXT dans le dossier 'mes_documents'
 
 🔧 Commandes :
-/sync - Charger les documents
+/sync - Charger les nouveaux documents
 /list - Voir les documents
 /folder - Voir où mettre les fichiers
 
@@ -55,34 +64,13 @@ async def show_folder(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def sync_local(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔄 Chargement des documents...")
     
-    loaded = 0
-    documents_cache.clear()
-    
-    for filename in os.listdir(DOCS_FOLDER):
-        file_path = os.path.join(DOCS_FOLDER, filename)
-        
-        try:
-            if filename.endswith('.pdf'):
-                # Lire PDF
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
-                documents_cache[filename] = text
-                loaded += 1
-                
-            elif filename.endswith(('.txt', '.md')):
-                # Lire texte
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    documents_cache[filename] = file.read()
-                loaded += 1
-                
-        except Exception as e:
-            print(f"Erreur avec {filename}: {e}")
+    # Seuls les fichiers nouveaux ou modifiés sont relus
+    result = await local_sync.sync(documents_cache)
     
     await update.message.reply_text(
-        f"✅ {loaded} documents chargés !\n"
+        f"✅ {len(documents_cache)} documents chargés !\n"
+        f"🆕 {len(result['added'])} nouveaux, ♻️ {len(result['updated'])} mis à jour, "
+        f"🗑️ {len(result['deleted'])} supprimés\n"
         "Pose tes questions maintenant !"
     )
 
@@ -127,15 +115,35 @@ Question : {question}"""
     except Exception as e:
         await update.message.reply_text(f"❌ Erreur : {str(e)}")
 
+# Surveillance du dossier en tâche de fond
+async def post_init(application: Application):
+    """Charge le dossier puis le surveille (nouveaux fichiers, modifications, suppressions)"""
+    if WATCH_INTERVAL_SECONDS > 0:
+        application.bot_data['watch_task'] = asyncio.create_task(
+            local_sync.watch(documents_cache, interval=WATCH_INTERVAL_SECONDS)
+        )
+
+async def post_shutdown(application: Application):
+    """Arrête la surveillance du dossier"""
+    task = application.bot_data.get('watch_task')
+    if task:
+        task.cancel()
+
 def main():
     print(f"🚀 Bot démarré !")
     print(f"📁 Dossier documents : {os.path.abspath(DOCS_FOLDER)}")
     
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    app = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("folder", show_folder))
-    app.add_handler(CommandHandler("sync", sync_local))
+    app.add_handler(CommandHandler("sync", sync_local, block=False))
     app.add_handler(CommandHandler("list", list_docs))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, answer_question))
     
@@ -14,9 +14,17 @@ import asyncio
 import random
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-import PyPDF2
-import io
 from quiz_predefined import get_random_quiz, get_full_quiz
+from services.chatpdf_registry import ChatPdfRegistry
+from services.document_store import create_document_store
+from services.french_analyzer import analyze, fold
+from services.github_sync import GitHubSync, GitHubSyncError, parse_globs
+from services.pdf_extractor import PdfExtractor
+from services.search_query import QueryError
+from services.snapshot import load_snapshot, save_snapshot
+from services.text_cache import ExtractedTextCache
+from services.text_normalizer import NormalizedText
+from config import Config
 
 # Configuration du logging
 logging.basicConfig(
@@ -29,6 +37,22 @@ logger = logging.getLogger(__name__)
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 CHATPDF_KEY = os.environ.get("CHATPDF_API_KEY")
 GITHUB_REPO = os.environ.get("GITHUB_REPO", "ghaf35/mes-cours")
+GITHUB_BRANCH = os.environ.get("GITHUB_BRANCH", "main")
+GITHUB_INCLUDE = os.environ.get("GITHUB_INCLUDE")  # Globs séparés par des virgules, ex: "cours/*.pdf,*.md"
+GITHUB_EXCLUDE = os.environ.get("GITHUB_EXCLUDE")
+MAX_FILE_SIZE_MB = int(os.environ.get("MAX_FILE_SIZE_MB", "50"))
+GITHUB_SYNC_MODE = os.environ.get("GITHUB_SYNC_MODE", "auto")  # api, archive ou auto (archive au 1er chargement)
+SYNC_CONCURRENCY = int(os.environ.get("SYNC_CONCURRENCY", "8"))  # Téléchargements simultanés
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))  # Processus d'extraction PDF
+PDF_BACKEND = Config.PDF_BACKEND  # Réglage commun (config.py) : auto, pypdf2, pdfplumber, pypdfium2 ou pymupdf
+TEXT_CACHE_DIR = os.environ.get("TEXT_CACHE_DIR", "text_cache")  # Vide = pas de cache disque
+DOCUMENT_STORE = os.environ.get("DOCUMENT_STORE", "memory")  # memory, mmap (corpus UTF-8 projeté) ou compressed (segments compressés)
+CORPUS_DIR = os.environ.get("CORPUS_DIR", "corpus")  # Fichier du corpus en mode mmap
+SUBSTRING_INDEX = os.environ.get("SUBSTRING_INDEX", "0") == "1"  # Table des suffixes : sous-chaînes exactes (lent à l'ajout)
+SYNC_INTERVAL_MINUTES = float(os.environ.get("SYNC_INTERVAL_MINUTES", "15"))  # 0 = pas de synchro périodique
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "snapshot/bot_natural.snap")  # Vide = pas de démarrage à chaud
+CHATPDF_REGISTRY_PATH = os.environ.get("CHATPDF_REGISTRY_PATH", "state/chatpdf_sources.json")  # Hash du contenu -> sourceId
+CHATPDF_UPLOAD_CONCURRENCY = int(os.environ.get("CHATPDF_UPLOAD_CONCURRENCY", "4"))  # Uploads ChatPDF simultanés
 
 # Vérifier la config
 if not TELEGRAM_TOKEN:
@@ -43,8 +67,81 @@ logger.info(f"✅ Configuration OK - Repo: {GITHUB_REPO}")
 logger.info("✅ ChatPDF API Key détectée")
 
 # Cache des documents
-documents_cache = {}
+documents_cache = create_document_store(DOCUMENT_STORE, CORPUS_DIR, SUBSTRING_INDEX)  # Documents avec leurs limites de pages
 chatpdf_sources = {}  # Stocke les sourceId ChatPDF
+chatpdf_registry = ChatPdfRegistry(CHATPDF_KEY, CHATPDF_REGISTRY_PATH, max_concurrency=CHATPDF_UPLOAD_CONCURRENCY)
+pdf_extractor = PdfExtractor(
+    max_workers=PDF_WORKERS,
+    cache=ExtractedTextCache(TEXT_CACHE_DIR) if TEXT_CACHE_DIR else None,
+    backend=PDF_BACKEND
+)
+github_sync = GitHubSync(
+    GITHUB_REPO,
+    max_concurrency=SYNC_CONCURRENCY,
+    extractor=pdf_extractor,
+    branch=GITHUB_BRANCH,
+    include=parse_globs(GITHUB_INCLUDE),
+    exclude=parse_globs(GITHUB_EXCLUDE),
+    max_file_size=MAX_FILE_SIZE_MB * 1024 * 1024,
+    mode=GITHUB_SYNC_MODE
+)
+snapshot_lock = asyncio.Lock()
+
+# Démarrage à chaud : état complet sauvegardé après chaque synchronisation
+def load_startup_snapshot() -> bool:
+    """Recharge documents, manifeste et sources ChatPDF depuis le snapshot"""
+    if not SNAPSHOT_PATH:
+        return False
+    state = load_snapshot(SNAPSHOT_PATH, documents_cache)
+    if state is None:
+        return False
+    if not github_sync.load_state(state['github']):
+        logger.warning("⚠️ Snapshot d'une autre configuration GitHub, ignoré")
+        documents_cache.clear()
+        return False
+    chatpdf_sources.update(state['chatpdf_sources'])
+    # Le registre a le dernier mot (sources remplacées après un 404)
+    for doc_name, entry in github_sync.manifest.items():
+        source_id = chatpdf_registry.source_id(entry['sha'])
+        if source_id:
+            chatpdf_sources[doc_name] = source_id
+    return True
+
+async def write_snapshot():
+    """Sauvegarde l'état courant (en tâche de fond, écriture atomique)"""
+    if not SNAPSHOT_PATH:
+        return
+    # Verrou de synchronisation : aucun document ajouté, supprimé ou compacté pendant l'écriture
+    async with snapshot_lock, github_sync.lock:
+        state = {'github': github_sync.export_state(), 'chatpdf_sources': dict(chatpdf_sources)}
+        try:
+            await asyncio.to_thread(save_snapshot, SNAPSHOT_PATH, documents_cache, state)
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture du snapshot : {e}")
+
+# Reporter un delta de synchronisation sur ChatPDF
+async def apply_sync_result(result: dict):
+    """Met à jour les sources ChatPDF après une synchronisation"""
+    # Les sources ChatPDF des documents supprimés ou modifiés ne sont plus valides
+    for doc_name in result['deleted'] + result['updated']:
+        chatpdf_sources.pop(doc_name, None)
+    
+    # PDF sans source : le registre réutilise la source d'un contenu déjà
+    # uploadé (même SHA), seuls les contenus inconnus partent sur ChatPDF
+    pdfs = {
+        doc_name: (entry['sha'], github_sync.raw_url(doc_name))
+        for doc_name, entry in github_sync.manifest.items()
+        if doc_name.endswith('.pdf') and doc_name not in chatpdf_sources
+    }
+    if pdfs and CHATPDF_KEY:
+        source_ids = await chatpdf_registry.ensure_many(pdfs)
+        chatpdf_sources.update(source_ids)
+        if len(source_ids) < len(pdfs):
+            logger.warning(f"⚠️ {len(pdfs) - len(source_ids)} PDF non disponibles sur ChatPDF")
+    
+    # Rien n'a changé et un snapshot existe : inutile de le réécrire
+    if result['added'] or result['updated'] or result['deleted'] or not os.path.exists(SNAPSHOT_PATH):
+        await write_snapshot()
 
 # Fonction de synchronisation automatique au démarrage
 async def auto_sync_at_startup():
@@ -52,55 +149,10 @@ async def auto_sync_at_startup():
     logger.info("🔄 Synchronisation automatique au démarrage...")
     
     try:
-        # Vider le cache
-        documents_cache.clear()
-        chatpdf_sources.clear()
+        result = await github_sync.sync(documents_cache)
+        await apply_sync_result(result)
         
-        # Headers pour l'API GitHub
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        
-        # Récupérer la liste des fichiers
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/contents"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            logger.error(f"❌ Erreur GitHub : {response.status_code}")
-            return False
-        
-        files = response.json()
-        loaded = 0
-        
-        # Charger chaque fichier
-        for file in files:
-            if file['name'].endswith(('.pdf', '.txt', '.md')):
-                try:
-                    # Télécharger le fichier
-                    file_response = requests.get(file['download_url'])
-                    
-                    if file['name'].endswith('.pdf'):
-                        # Lire le PDF
-                        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_response.content))
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                        
-                        # Si ChatPDF est disponible, uploader
-                        if CHATPDF_KEY:
-                            raw_url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/{file['name']}"
-                            source_id = await upload_to_chatpdf(raw_url, file['name'])
-                            if source_id:
-                                logger.info(f"✅ {file['name']} uploadé sur ChatPDF")
-                    else:
-                        # Fichier texte
-                        text = file_response.text
-                    
-                    # Stocker en cache
-                    documents_cache[file['name']] = text
-                    loaded += 1
-                    logger.info(f"✅ Document chargé : {file['name']}")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erreur avec {file['name']}: {e}")
+        loaded = len(documents_cache)
         
         if loaded > 0:
             logger.info(f"✅ Synchronisation automatique terminée : {loaded} documents")
@@ -111,7 +163,10 @@ async def auto_sync_at_startup():
         else:
             logger.warning("⚠️ Aucun document trouvé lors de la synchronisation automatique")
             return False
-            
+    
+    except GitHubSyncError as e:
+        logger.error(f"❌ Erreur GitHub : {e.status_code}")
+        return False
     except Exception as e:
         logger.error(f"❌ Erreur synchronisation automatique : {e}")
         return False
@@ -119,19 +174,35 @@ async def auto_sync_at_startup():
 # Fonction pour détecter l'intention de l'utilisateur
 def detect_intent(message: str) -> dict:
     """Détecte ce que l'utilisateur veut faire à partir du langage naturel"""
-    message_lower = message.lower()
-    
-    # Patterns pour détecter les intentions
+    # Sans accents ni majuscules : "resume" comme "Résumé" (claviers de téléphone)
+    message_folded = fold(message)
+    
+    # "page 12" ou "pages 3 à 5" d'un document connu : servi depuis la mémoire
+    page_match = re.search(r'\bpages?\s+(\d+)(?:\s*(?:-|a)\s*(\d+))?', message_folded)
+    if page_match and not re.search(r'tableau|graphique', message_folded):
+        doc_name = extract_document_name(message)
+        if doc_name:
+            first = int(page_match.group(1))
+            return {
+                'intent': 'page',
+                'document': doc_name,
+                'concept': None,
+                'pages': (first, int(page_match.group(2) or first)),
+                'original': message
+            }
+    
+    # Patterns pour détecter les intentions (écrits sans accents)
     patterns = {
-        'sync': [r'synchronise', r'charge', r'télécharge', r'met à jour', r'actualise'],
+        'sync': [r'synchronise', r'charge', r'telecharge', r'met a jour', r'actualise'],
         'list': [r'liste', r'montre', r'affiche', r'voir.*documents?', r'qu.*documents?'],
-        'search': [r'cherche', r'trouve', r'recherche', r'où.*(?:est|sont)', r'contient'],
-        'summary': [r'résume', r'résumé', r'résumer', r'aperçu', r'synthèse'],
-        'analyze': [r'analyse', r'analyser', r'détail', r'approfondi'],
+        # "ou" sans accent est aussi la conjonction : seulement en tête de phrase
+        'search': [r'cherche', r'trouve', r'recherche', r'^ou\b.*(?:est|sont)', r'contient'],
+        'summary': [r'resume', r'resumer', r'apercu', r'synthese'],
+        'analyze': [r'analyse', r'analyser', r'detail', r'approfondi'],
         'quiz': [r'quiz', r'qcm', r'test', r'questionnaire', r'exercice'],
-        'flashcards': [r'carte', r'fiche', r'révision', r'flashcard'],
-        'explain': [r'explique', r'expliquer', r'c\'est quoi', r'qu\'est-ce', r'comprendre', r'définition'],
-        'mindmap': [r'carte mentale', r'mind map', r'schéma', r'diagramme'],
+        'flashcards': [r'carte', r'fiche', r'revision', r'flashcard'],
+        'explain': [r'explique', r'expliquer', r'c\'est quoi', r'qu\'est-ce', r'comprendre', r'definition'],
+        'mindmap': [r'carte mentale', r'mind map', r'schema', r'diagramme'],
         'help': [r'aide', r'comment', r'utilise', r'guide', r'manuel'],
         'chatpdf': [r'tableau', r'graphique', r'page \d+', r'extrait', r'citation']
     }
@@ -139,7 +210,7 @@ def detect_intent(message: str) -> dict:
     # Chercher l'intention
     for intent, patterns_list in patterns.items():
         for pattern in patterns_list:
-            if re.search(pattern, message_lower):
+            if re.search(pattern, message_folded):
                 # Extraire le document ou le concept mentionné
                 doc_name = extract_document_name(message)
                 concept = extract_concept(message)
@@ -161,19 +232,19 @@ def detect_intent(message: str) -> dict:
 
 def extract_document_name(message: str) -> str:
     """Extrait le nom du document de la phrase"""
-    message_lower = message.lower()
+    message_folded = fold(message)
     
-    # Chercher dans le cache
+    # Chercher dans le cache (noms normalisés une seule fois, cf. fold)
     for doc_name in documents_cache.keys():
-        doc_lower = doc_name.lower()
-        doc_base = doc_lower.replace('.pdf', '').replace('.txt', '')
+        doc_folded = fold(doc_name)
+        doc_base = doc_folded.replace('.pdf', '').replace('.txt', '')
         
-        if doc_lower in message_lower or doc_base in message_lower:
+        if doc_folded in message_folded or doc_base in message_folded:
             return doc_name
         
         # Chercher des morceaux du nom
         words = doc_base.split('-')
-        if len(words) > 1 and any(word in message_lower for word in words if len(word) > 4):
+        if len(words) > 1 and any(word in message_folded for word in words if len(word) > 4):
             return doc_name
     
     # Patterns pour extraire des références
@@ -184,13 +255,13 @@ def extract_document_name(message: str) -> str:
     ]
     
     for pattern in patterns:
-        match = re.search(pattern, message_lower)
+        match = re.search(pattern, message_folded)
         if match:
             potential_doc = match.group(1).strip()
             # Chercher une correspondance partielle
-            for doc_name in documents_cache.keys():
-                if potential_doc in doc_name.lower():
-                    return doc_name
+            found_doc = documents_cache.resolve_name(potential_doc)
+            if found_doc:
+                return found_doc
     
     return None
 
@@ -203,16 +274,18 @@ def extract_concept(message: str) -> str:
         r'cherche\s+(.+?)(?:\s+dans|$)',
         r'trouve\s+(.+?)(?:\s+dans|$)',
         r'sur\s+(.+?)(?:\s+dans|$)',
-        r'définition\s+(?:de\s+)?(.+)',
+        r'definition\s+(?:de\s+)?(.+)',
         r'role\s+(?:de\s+)?(.+)',
         r'qu\'est\s+ce\s+qu[\'e]\s+(.+)'
     ]
     
-    message_lower = message.lower()
+    # Patterns cherchés sans accents, concept repris du message (accents gardés)
+    folded = NormalizedText.build(message)
+    to_original = lambda offset: folded.to_original(offset, lambda start, end: message[start:end])
     for pattern in patterns:
-        match = re.search(pattern, message_lower)
+        match = re.search(pattern, folded.text)
         if match:
-            concept = match.group(1).strip()
+            concept = message[to_original(match.start(1)):to_original(match.end(1))].lower().strip()
             # Nettoyer le concept
             concept = concept.replace('?', '').replace('.', '').strip()
             # Enlever les mots vides à la fin
@@ -221,11 +294,11 @@ def extract_concept(message: str) -> str:
     
     # Si aucun pattern ne match, essayer de deviner le concept
     # après des mots clés comme "explique"
-    keywords = ['explique', 'définition', 'c\'est quoi', 'qu\'est-ce']
+    keywords = ['explique', 'definition', 'c\'est quoi', 'qu\'est-ce']
     for keyword in keywords:
-        if keyword in message_lower:
+        if keyword in folded.text:
             # Prendre tout ce qui suit le mot clé
-            index = message_lower.find(keyword) + len(keyword)
+            index = to_original(folded.text.find(keyword) + len(keyword))
             potential_concept = message[index:].strip()
             # Enlever "moi" s'il est au début
             potential_concept = re.sub(r'^[\s-]*moi\s+', '', potential_concept)
@@ -235,42 +308,7 @@ def extract_concept(message: str) -> str:
     return None
 
 # ChatPDF Integration
-async def upload_to_chatpdf(pdf_url: str, doc_name: str) -> str:
-    """Upload un PDF sur ChatPDF et retourne le sourceId"""
-    if not CHATPDF_KEY:
-        return None
-    
-    try:
-        headers = {
-            'x-api-key': CHATPDF_KEY,
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'url': pdf_url
-        }
-        
-        response = requests.post(
-            'https://api.chatpdf.com/v1/sources/add-url',
-            headers=headers,
-            json=data
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            source_id = result['sourceId']
-            logger.info(f"PDF uploadé sur ChatPDF: {doc_name} -> {source_id}")
-            chatpdf_sources[doc_name] = source_id
-            return source_id
-        else:
-            logger.error(f"Erreur ChatPDF upload: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        logger.error(f"Erreur upload ChatPDF: {e}")
-        return None
-
-async def ask_chatpdf(source_id: str, question: str) -> str:
+async def ask_chatpdf(source_id: str, question: str, retry: bool = True) -> str:
     """Pose une question à ChatPDF"""
     if not CHATPDF_KEY or not source_id:
         return None
@@ -338,6 +376,15 @@ async def ask_chatpdf(source_id: str, question: str) -> str:
                         content += f"• Page {ref['pageNumber']}\n"
             
             return content
+        elif response.status_code == 404 and retry:
+            # Source supprimée côté ChatPDF : nouvel upload puis nouvel essai
+            new_source_id = await chatpdf_registry.reupload(source_id)
+            if not new_source_id:
+                return None
+            for doc_name, doc_source_id in list(chatpdf_sources.items()):
+                if doc_source_id == source_id:
+                    chatpdf_sources[doc_name] = new_source_id
+            return await ask_chatpdf(new_source_id, question, retry=False)
         else:
             logger.error(f"Erreur ChatPDF question: {response.status_code}")
             return None
@@ -414,63 +461,30 @@ async def sync_github(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
     
     try:
-        # Vider le cache avant de synchroniser
-        documents_cache.clear()
-        chatpdf_sources.clear()
-        logger.info("Cache vidé - rechargement complet")
-        
-        # Headers pour l'API GitHub
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        
-        # Récupérer la liste des fichiers
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/contents"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
+        # Synchronisation incrémentale : seuls les fichiers ajoutés ou modifiés
+        # (SHA différent) sont retéléchargés
+        try:
+            result = await github_sync.sync(documents_cache)
+        except GitHubSyncError as e:
             await update.message.reply_text(
                 f"❌ *Erreur GitHub*\n\n"
-                f"Code : `{response.status_code}`\n"
+                f"Code : `{e.status_code}`\n"
                 f"Vérifie que le repo *{GITHUB_REPO}* existe et est public !",
                 parse_mode='Markdown'
             )
             return
         
-        files = response.json()
-        loaded = 0
+        await apply_sync_result(result)
         
-        # Charger chaque fichier
-        for file in files:
-            if file['name'].endswith(('.pdf', '.txt', '.md')):
-                try:
-                    # Télécharger le fichier
-                    file_response = requests.get(file['download_url'])
-                    
-                    if file['name'].endswith('.pdf'):
-                        # Lire le PDF
-                        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_response.content))
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                        
-                        # Si ChatPDF est disponible, uploader
-                        if CHATPDF_KEY:
-                            raw_url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/{file['name']}"
-                            await upload_to_chatpdf(raw_url, file['name'])
-                    else:
-                        # Fichier texte
-                        text = file_response.text
-                    
-                    # Stocker en cache
-                    documents_cache[file['name']] = text
-                    loaded += 1
-                    logger.info(f"Document chargé : {file['name']}")
-                    
-                except Exception as e:
-                    logger.error(f"Erreur avec {file['name']}: {e}")
+        loaded = len(documents_cache)
         
         if loaded > 0:
             message = f"✅ *Synchronisation terminée !*\n\n"
             message += f"📚 *{loaded} documents chargés*\n"
+            message += (
+                f"🆕 {len(result['added'])} nouveaux • ♻️ {len(result['updated'])} mis à jour • "
+                f"🗑️ {len(result['deleted'])} supprimés\n"
+            )
             if CHATPDF_KEY and chatpdf_sources:
                 message += f"🤖 *{len(chatpdf_sources)} documents sur ChatPDF*\n"
             message += f"\n💬 Tu peux maintenant me poser des questions !\n"
@@ -504,7 +518,8 @@ async def handle_natural_language(update: Update, context: ContextTypes.DEFAULT_
     
     # Router vers la bonne fonction
     if intent == 'sync':
-        await sync_github(update, context)
+        # La synchro tourne en tâche de fond pour ne pas bloquer les autres chats
+        context.application.create_task(sync_github(update, context), update=update)
     
     elif intent == 'list':
         await list_docs_natural(update, context)
@@ -537,6 +552,9 @@ async def handle_natural_language(update: Update, context: ContextTypes.DEFAULT_
     elif intent == 'help':
         await help_natural(update, context)
     
+    elif intent == 'page':
+        await page_natural(update, context, doc_name, *intent_data['pages'])
+    
     elif intent == 'chatpdf' and CHATPDF_KEY and doc_name:
         await chatpdf_question(update, context, doc_name, message)
     
@@ -582,29 +600,35 @@ async def search_natural(update: Update, context: ContextTypes.DEFAULT_TYPE, sea
     
     # Utiliser la fonction de recherche existante
     # (Code de recherche similaire à search_in_docs mais avec messages naturels)
+    # Index positionnel construit à la synchronisation : seules les occurrences sont lues
+    try:
+        hits = documents_cache.search(search_term, limit=1)
+    except QueryError as e:
+        await update.message.reply_text(
+            f"😅 Je n'ai pas compris cette recherche : {e}",
+            parse_mode='Markdown'
+        )
+        return
+    
     results = []
-    for doc_name, content in documents_cache.items():
-        if search_term.lower() in content.lower():
-            # Trouver le contexte
-            lines = content.split('\n')
-            for i, line in enumerate(lines):
-                if search_term.lower() in line.lower():
-                    context_start = max(0, i-1)
-                    context_end = min(len(lines), i+2)
-                    context_text = '\n'.join(lines[context_start:context_end])
-                    
-                    results.append({
-                        'document': doc_name,
-                        'line': i + 1,
-                        'context': context_text[:200] + "..." if len(context_text) > 200 else context_text
-                    })
-                    break
+    for hit in hits:
+        # Trouver le contexte
+        context_text = "".join(documents_cache.excerpt(hit['document'], hit['start'], hit['end']))
+        results.append({
+            'document': hit['document'],
+            'line': hit['line'],
+            'page': hit['page'],
+            'context': context_text[:200] + "..." if len(context_text) > 200 else context_text
+        })
     
     if results:
         message = f"🎯 *J'ai trouvé \"{search_term}\" dans :*\n\n"
         for result in results[:5]:
             message += f"📄 *{result['document']}*\n"
-            message += f"_Ligne {result['line']} :_\n"
+            if result['page']:
+                message += f"_Page {result['page']}, ligne {result['line']} :_\n"
+            else:
+                message += f"_Ligne {result['line']} :_\n"
             message += f"{result['context']}\n\n"
         
         message += f"✅ *{len(results)} résultats trouvés*"
@@ -614,6 +638,27 @@ async def search_natural(update: Update, context: ContextTypes.DEFAULT_TYPE, sea
     
     await update.message.reply_text(message, parse_mode='Markdown')
 
+async def page_natural(update: Update, context: ContextTypes.DEFAULT_TYPE, doc_name: str, first: int, last: int):
+    """Affiche une page (ou une plage de pages) d'un document"""
+    page_count = documents_cache.page_count(doc_name)
+    if first > last:
+        first, last = last, first
+    
+    if first < 1 or last > page_count:
+        await update.message.reply_text(
+            f"😅 *{doc_name}* n'a que {page_count} pages !",
+            parse_mode='Markdown'
+        )
+        return
+    
+    pages = f"Page {first}" if first == last else f"Pages {first} à {last}"
+    text = documents_cache.page_text(doc_name, first, last).strip() or "(page sans texte extractible)"
+    if len(text) > 3500:
+        text = text[:3500] + "\n\n... page tronquée"
+    
+    # Pas de Markdown : le texte brut du PDF casserait la mise en forme
+    await update.message.reply_text(f"📄 {doc_name} — {pages}\n\n{text}")
+
 async def summary_natural(update: Update, context: ContextTypes.DEFAULT_TYPE, doc_name: str):
     """Résumé en langage naturel"""
     if not documents_cache:
@@ -1015,11 +1060,9 @@ async def explain_natural(update: Update, context: ContextTypes.DEFAULT_TYPE, co
         
         # D'abord essayer de trouver un document pertinent
         for doc_name in chatpdf_sources.keys():
-            if doc_name in documents_cache:
-                content_lower = documents_cache[doc_name].lower()
-                if concept.lower() in content_lower:
-                    doc_to_use = doc_name
-                    break
+            if doc_name in documents_cache and documents_cache.contains(doc_name, concept):
+                doc_to_use = doc_name
+                break
         
         # Si pas de document spécifique, prendre le premier (probablement TESM.pdf)
         if not doc_to_use and len(chatpdf_sources) > 0:
@@ -1195,21 +1238,9 @@ async def answer_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
             logger.info("Utilisation de ChatPDF pour répondre")
             
             # Chercher le document le plus pertinent
-            question_lower = question.lower()
-            best_doc = None
-            best_score = 0
-            
-            for doc_name in chatpdf_sources.keys():
-                if doc_name in documents_cache:
-                    content_lower = documents_cache[doc_name].lower()
-                    score = 0
-                    for word in question_lower.split():
-                        if len(word) > 3:
-                            score += content_lower.count(word)
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_doc = doc_name
+            # (BM25 sur l'index inversé, parmi les documents envoyés à ChatPDF)
+            ranking = documents_cache.rank(analyze(question), names=list(chatpdf_sources), limit=1)
+            best_doc, best_score = ranking[0] if ranking else (None, 0)
             
             # Si on a trouvé un document pertinent, utiliser ChatPDF
             if best_doc and best_score > 0:
@@ -1396,6 +1427,28 @@ async def show_quiz_results(update: Update, context: ContextTypes.DEFAULT_TYPE,
     except Exception as e:
         logger.error(f"Erreur affichage résultats : {e}")
 
+# Synchronisation périodique en tâche de fond (sans job-queue)
+async def post_init(application: Application):
+    """Lance la synchronisation de démarrage et la boucle périodique en tâche de fond"""
+    # Le bot répond déjà (documents du snapshot) pendant que le delta est appliqué
+    application.bot_data['startup_sync_task'] = asyncio.create_task(auto_sync_at_startup())
+    if SYNC_INTERVAL_MINUTES > 0:
+        application.bot_data['sync_task'] = asyncio.create_task(
+            github_sync.run_periodic(
+                documents_cache,
+                interval=SYNC_INTERVAL_MINUTES * 60,
+                on_change=apply_sync_result
+            )
+        )
+        logger.info(f"🔁 Synchronisation périodique toutes les {SYNC_INTERVAL_MINUTES:g} min")
+
+async def post_shutdown(application: Application):
+    """Arrête les tâches de synchronisation"""
+    for key in ('startup_sync_task', 'sync_task'):
+        task = application.bot_data.get(key)
+        if task:
+            task.cancel()
+
 # Garder les handlers de commandes pour la compatibilité
 async def aide_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Commande /aide"""
@@ -1414,29 +1467,30 @@ def main():
     
     try:
         # Créer l'application
-        app = Application.builder().token(TELEGRAM_TOKEN).build()
+        app = (
+            Application.builder()
+            .token(TELEGRAM_TOKEN)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
         
-        # Synchronisation automatique au démarrage (avec gestion d'erreur)
+        # Démarrage à chaud : la synchronisation tourne ensuite en tâche de fond (post_init)
         try:
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            sync_result = loop.run_until_complete(auto_sync_at_startup())
-            
-            if sync_result:
-                logger.info("✅ Documents prêts ! Le bot peut répondre aux questions.")
+            if load_startup_snapshot():
+                logger.info(f"✅ {len(documents_cache)} documents prêts (snapshot) ! Le bot peut répondre aux questions.")
             else:
-                logger.warning("⚠️ Synchronisation automatique échouée, utilisez /synchroniser")
+                logger.info("📭 Pas de snapshot valide : les documents arrivent avec la première synchronisation")
         except Exception as e:
-            logger.error(f"❌ Erreur lors de la synchronisation automatique : {e}")
+            logger.error(f"❌ Erreur lors du chargement du snapshot : {e}")
             logger.warning("⚠️ Le bot démarre sans documents préchargés")
         
         # Handlers de commandes (compatibilité)
         app.add_handler(CommandHandler("start", start))
         app.add_handler(CommandHandler("aide", aide_command))
         app.add_handler(CommandHandler("help", aide_command))
-        app.add_handler(CommandHandler("synchroniser", sync_github))
-        app.add_handler(CommandHandler("sync", sync_github))
+        app.add_handler(CommandHandler("synchroniser", sync_github, block=False))
+        app.add_handler(CommandHandler("sync", sync_github, block=False))
         app.add_handler(CommandHandler("liste", liste_command))
         app.add_handler(CommandHandler("list", liste_command))
         
@@ -1446,11 +1500,6 @@ def main():
             handle_natural_language
         ))
         
-        # Synchronisation périodique (optionnel - toutes les heures)
-        # Désactivé pour l'instant car nécessite une installation supplémentaire
-        # Si besoin plus tard, installer avec: pip install "python-telegram-bot[job-queue]"
-        logger.info("ℹ️ Synchronisation périodique désactivée (optionnelle)")
-        
         # Handler pour les réponses aux quiz
         from telegram.ext import PollAnswerHandler
         app.add_handler(PollAnswerHandler(handle_poll_answer))
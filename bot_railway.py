@@ -5,14 +5,19 @@ Bot Telegram optimisé pour Railway
 
 import os
 import sys
+import asyncio
 import logging
-import requests
 import tempfile
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from mistralai import Mistral
-import PyPDF2
-import io
+from services.document_store import create_document_store
+from services.french_analyzer import analyze
+from services.github_sync import GitHubSync, GitHubSyncError, parse_globs
+from services.pdf_extractor import PdfExtractor
+from services.search_query import QueryError
+from services.text_cache import ExtractedTextCache
+from config import Config
 
 # PAS de dotenv sur Railway !
 
@@ -27,6 +32,19 @@ logger = logging.getLogger(__name__)
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 MISTRAL_KEY = os.environ.get("MISTRAL_API_KEY")
 GITHUB_REPO = os.environ.get("GITHUB_REPO", "ghaf35/mes-cours")
+GITHUB_BRANCH = os.environ.get("GITHUB_BRANCH", "main")
+GITHUB_INCLUDE = os.environ.get("GITHUB_INCLUDE")  # Globs séparés par des virgules, ex: "cours/*.pdf,*.md"
+GITHUB_EXCLUDE = os.environ.get("GITHUB_EXCLUDE")
+MAX_FILE_SIZE_MB = int(os.environ.get("MAX_FILE_SIZE_MB", "50"))
+GITHUB_SYNC_MODE = os.environ.get("GITHUB_SYNC_MODE", "auto")  # api, archive ou auto (archive au 1er chargement)
+SYNC_CONCURRENCY = int(os.environ.get("SYNC_CONCURRENCY", "8"))  # Téléchargements simultanés
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))  # Processus d'extraction PDF
+PDF_BACKEND = Config.PDF_BACKEND  # Réglage commun (config.py) : auto, pypdf2, pdfplumber, pypdfium2 ou pymupdf
+TEXT_CACHE_DIR = os.environ.get("TEXT_CACHE_DIR", "text_cache")  # Vide = pas de cache disque
+DOCUMENT_STORE = os.environ.get("DOCUMENT_STORE", "memory")  # memory, mmap (corpus UTF-8 projeté) ou compressed (segments compressés)
+CORPUS_DIR = os.environ.get("CORPUS_DIR", "corpus")  # Fichier du corpus en mode mmap
+SUBSTRING_INDEX = os.environ.get("SUBSTRING_INDEX", "0") == "1"  # Table des suffixes : sous-chaînes exactes (lent à l'ajout)
+SYNC_INTERVAL_MINUTES = float(os.environ.get("SYNC_INTERVAL_MINUTES", "15"))  # 0 = pas de synchro périodique
 
 # Vérifier la config
 if not TELEGRAM_TOKEN:
@@ -48,7 +66,22 @@ except Exception as e:
     sys.exit(1)
 
 # Cache des documents
-documents_cache = {}
+documents_cache = create_document_store(DOCUMENT_STORE, CORPUS_DIR, SUBSTRING_INDEX)  # Documents avec leurs limites de pages
+pdf_extractor = PdfExtractor(
+    max_workers=PDF_WORKERS,
+    cache=ExtractedTextCache(TEXT_CACHE_DIR) if TEXT_CACHE_DIR else None,
+    backend=PDF_BACKEND
+)
+github_sync = GitHubSync(
+    GITHUB_REPO,
+    max_concurrency=SYNC_CONCURRENCY,
+    extractor=pdf_extractor,
+    branch=GITHUB_BRANCH,
+    include=parse_globs(GITHUB_INCLUDE),
+    exclude=parse_globs(GITHUB_EXCLUDE),
+    max_file_size=MAX_FILE_SIZE_MB * 1024 * 1024,
+    mode=GITHUB_SYNC_MODE
+)
 
 # Commande /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -123,58 +156,31 @@ async def sync_github(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     try:
-        # Vider le cache avant de synchroniser
-        documents_cache.clear()
-        logger.info("Cache vidé - rechargement complet")
-        
-        # Headers pour l'API GitHub
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        
-        # Récupérer la liste des fichiers
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/contents"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
+        # Synchronisation incrémentale : seuls les fichiers ajoutés ou modifiés
+        # (SHA différent) sont téléchargés, les fichiers supprimés sont retirés
+        try:
+            result = await github_sync.sync(documents_cache)
+        except GitHubSyncError as e:
             await update.message.reply_text(
                 f"❌ *Erreur GitHub*\n\n"
-                f"Code : `{response.status_code}`\n"
+                f"Code : `{e.status_code}`\n"
                 f"Vérifie que le repo *{GITHUB_REPO}* existe et est public !",
                 parse_mode='Markdown'
             )
             return
         
-        files = response.json()
-        loaded = 0
-        
-        # Charger chaque fichier
-        for file in files:
-            if file['name'].endswith(('.pdf', '.txt', '.md')):
-                try:
-                    # Télécharger le fichier
-                    file_response = requests.get(file['download_url'])
-                    
-                    if file['name'].endswith('.pdf'):
-                        # Lire le PDF
-                        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_response.content))
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                    else:
-                        # Fichier texte
-                        text = file_response.text
-                    
-                    # Stocker en cache
-                    documents_cache[file['name']] = text
-                    loaded += 1
-                    logger.info(f"Document chargé : {file['name']}")
-                    
-                except Exception as e:
-                    logger.error(f"Erreur avec {file['name']}: {e}")
+        loaded = len(documents_cache)
+        logger.info(
+            f"Synchronisation : {len(result['added'])} ajoutés, {len(result['updated'])} modifiés, "
+            f"{len(result['deleted'])} supprimés, {len(result['unchanged'])} inchangés"
+        )
         
         if loaded > 0:
             await update.message.reply_text(
                 f"✅ *Synchronisation terminée !*\n\n"
                 f"📚 *{loaded} documents chargés*\n"
+                f"🆕 {len(result['added'])} nouveaux • ♻️ {len(result['updated'])} mis à jour • "
+                f"🗑️ {len(result['deleted'])} supprimés\n"
                 f"🎯 Tu peux maintenant me poser des questions !\n\n"
                 f"💡 _Utilise `/liste` pour voir les documents_",
                 parse_mode='Markdown'
@@ -225,12 +231,17 @@ async def search_in_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         await update.message.reply_text(
             "🔍 *Utilisation :* `/recherche [mot ou phrase]`\n\n"
-            "Exemple : `/recherche photosynthèse`",
+            "Exemple : `/recherche photosynthèse`\n\n"
+            "*Recherche avancée :*\n"
+            "• `\"phrase exacte\"`\n"
+            "• `issue AND secours`, `issue OR sortie`, `issue NOT secours` (ou `-secours`)\n"
+            "• `issue NEAR/5 secours` → à 5 mots au plus",
             parse_mode='Markdown'
         )
         return
     
-    search_term = ' '.join(context.args).lower()
+    # Pas de .lower() : AND, OR, NOT et NEAR s'écrivent en majuscules
+    search_term = ' '.join(context.args)
     logger.info(f"Recherche de : {search_term}")
     
     if not documents_cache:
@@ -247,34 +258,34 @@ async def search_in_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
     
-    # Rechercher dans tous les documents
+    # Index positionnel construit à la synchronisation : seules les occurrences sont lues
+    try:
+        hits = documents_cache.search(search_term, limit=3)  # Max 3 par document
+    except QueryError as e:
+        await update.message.reply_text(
+            f"❌ *Requête invalide :* {e}\n\n"
+            "Exemple : `/recherche issue NEAR/5 secours`",
+            parse_mode='Markdown'
+        )
+        return
+    
     results = []
-    for doc_name, content in documents_cache.items():
-        lines = content.split('\n')
-        matches = []
-        
-        for i, line in enumerate(lines):
-            if search_term in line.lower():
-                # Contexte : ligne avant et après
-                start = max(0, i-1)
-                end = min(len(lines), i+2)
-                context_lines = lines[start:end]
-                context_text = '\n'.join(context_lines)
-                
-                # Limiter la longueur
-                if len(context_text) > 200:
-                    context_text = context_text[:200] + "..."
-                
-                matches.append({
-                    'line': i + 1,
-                    'context': context_text,
-                    'exact': line.strip()
-                })
-        
-        if matches:
+    for hit in hits:
+        # Contexte : ligne avant et après
+        before, found, after = documents_cache.excerpt(hit['document'], hit['start'], hit['end'])
+        match = {
+            'line': hit['line'],
+            'page': hit['page'],
+            'before': before,
+            'found': found,
+            'after': after
+        }
+        if results and results[-1]['document'] == hit['document']:
+            results[-1]['matches'].append(match)
+        else:
             results.append({
-                'document': doc_name,
-                'matches': matches[:3]  # Max 3 par document
+                'document': hit['document'],
+                'matches': [match]
             })
     
     # Formater les résultats
@@ -286,13 +297,14 @@ async def search_in_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
             message += f"{emoji} *{result['document']}*\n"
             
             for match in result['matches']:
-                message += f"   _Ligne {match['line']}:_\n"
-                # Mettre en évidence le terme recherché
-                highlighted = match['context'].replace(
-                    search_term, 
-                    f"*{search_term}*"
-                )
-                message += f"   {highlighted}\n\n"
+                if match['page']:
+                    message += f"   _Page {match['page']}, ligne {match['line']}:_\n"
+                else:
+                    message += f"   _Ligne {match['line']}:_\n"
+                # Limiter la longueur et mettre en évidence l'occurrence trouvée
+                before = match['before'][-100:]
+                after = match['after'][:100]
+                message += f"   {before}*{match['found']}*{after}\n\n"
             
             message += "━━━━━━━━━━━━━━━━━━━━━\n\n"
         
@@ -335,11 +347,7 @@ async def analyze_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     doc_name = ' '.join(context.args)
     
     # Chercher le document (correspondance exacte ou partielle)
-    found_doc = None
-    for name in documents_cache.keys():
-        if doc_name.lower() in name.lower():
-            found_doc = name
-            break
+    found_doc = documents_cache.resolve_name(doc_name)
     
     if not found_doc:
         await update.message.reply_text(
@@ -357,16 +365,15 @@ async def analyze_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         # Récupérer le contenu du document
-        content = documents_cache[found_doc]
-        words = len(content.split())
-        chars = len(content)
+        # (seul le début est lu : le document entier n'est pas décodé)
+        words = documents_cache.word_count(found_doc)
+        chars = documents_cache.char_length(found_doc)
         
         # Limiter le contenu pour l'analyse (max 5000 caractères pour Mistral)
-        if len(content) > 5000:
-            content_preview = content[:5000] + "\n\n[... Document tronqué pour l'analyse ...]"
-            logger.info(f"Document tronqué : {len(content)} -> 5000 caractères")
-        else:
-            content_preview = content
+        content_preview = documents_cache.passage(found_doc, 0, 5000)
+        if chars > 5000:
+            content_preview += "\n\n[... Document tronqué pour l'analyse ...]"
+            logger.info(f"Document tronqué : {chars} -> 5000 caractères")
         
         # Demander à l'IA une analyse détaillée et précise
         prompt = f"""ANALYSE PRÉCISE ET DÉTAILLÉE du document.
@@ -456,7 +463,7 @@ RAPPEL : Mets TOUS les titres entre *astérisques* pour le gras !"""
         logger.error(f"Erreur analyse: {e}")
         logger.error(f"Type d'erreur: {type(e).__name__}")
         logger.error(f"Document analysé: {found_doc}")
-        logger.error(f"Taille du document: {len(content)} caractères")
+        logger.error(f"Taille du document: {documents_cache.char_length(found_doc)} caractères")
         
         # Message d'erreur plus détaillé
         error_msg = "❌ *Erreur lors de l'analyse*\n\n"
@@ -491,19 +498,15 @@ async def quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         # Prendre un échantillon de tous les documents
         all_content = ""
-        for doc_name, content in list(documents_cache.items())[:3]:  # Max 3 docs
+        for doc_name in list(documents_cache.keys())[:3]:  # Max 3 docs
             all_content += f"\n=== {doc_name} ===\n"
-            all_content += content[:1000] + "\n"
+            all_content += documents_cache.passage(doc_name, 0, 1000) + "\n"
         content_for_quiz = all_content
         doc_name_display = "Tous les documents"
     else:
         # Quiz sur un document spécifique
         doc_name = ' '.join(context.args)
-        found_doc = None
-        for name in documents_cache.keys():
-            if doc_name.lower() in name.lower():
-                found_doc = name
-                break
+        found_doc = documents_cache.resolve_name(doc_name)
         
         if not found_doc:
             await update.message.reply_text(
@@ -512,7 +515,7 @@ async def quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
         
-        content_for_quiz = documents_cache[found_doc][:3000]
+        content_for_quiz = documents_cache.passage(found_doc, 0, 3000)
         doc_name_display = found_doc
         
         await update.message.reply_text(
@@ -628,11 +631,7 @@ async def flashcards_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Trouver le document
     doc_name = ' '.join(context.args)
-    found_doc = None
-    for name in documents_cache.keys():
-        if doc_name.lower() in name.lower():
-            found_doc = name
-            break
+    found_doc = documents_cache.resolve_name(doc_name)
     
     if not found_doc:
         await update.message.reply_text(
@@ -648,7 +647,7 @@ async def flashcards_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
     
     try:
-        content = documents_cache[found_doc][:3000]
+        content = documents_cache.passage(found_doc, 0, 3000)
         
         prompt = f"""Crée 5 flashcards (cartes de révision) sur ce contenu.
 
@@ -731,17 +730,12 @@ async def explain_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Chercher le concept dans les documents
         context_text = ""
         if documents_cache:
-            for doc_name, content in documents_cache.items():
-                if concept.lower() in content.lower():
-                    # Extraire le contexte autour du concept
-                    lines = content.split('\n')
-                    for i, line in enumerate(lines):
-                        if concept.lower() in line.lower():
-                            start = max(0, i-2)
-                            end = min(len(lines), i+3)
-                            context_text += '\n'.join(lines[start:end]) + "\n\n"
-                            if len(context_text) > 1000:
-                                break
+            for doc_name in documents_cache.keys():
+                # Extraire le contexte autour du concept (deux lignes de part et d'autre)
+                for start, end in documents_cache.find_all(doc_name, concept, limit=10):
+                    context_text += "".join(documents_cache.excerpt(doc_name, start, end, lines=2)) + "\n\n"
+                    if len(context_text) > 1000:
+                        break
                 if len(context_text) > 1000:
                     break
         
@@ -815,11 +809,7 @@ async def mindmap_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Trouver le document
     doc_name = ' '.join(context.args)
-    found_doc = None
-    for name in documents_cache.keys():
-        if doc_name.lower() in name.lower():
-            found_doc = name
-            break
+    found_doc = documents_cache.resolve_name(doc_name)
     
     if not found_doc:
         await update.message.reply_text(
@@ -835,7 +825,7 @@ async def mindmap_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     try:
-        content = documents_cache[found_doc][:2500]
+        content = documents_cache.passage(found_doc, 0, 2500)
         
         prompt = f"""Crée une carte mentale textuelle de ce document.
 
@@ -914,11 +904,7 @@ async def summary_doc(update: Update, context: ContextTypes.DEFAULT_TYPE):
     doc_name = ' '.join(context.args)
     
     # Chercher le document
-    found_doc = None
-    for name in documents_cache.keys():
-        if doc_name.lower() in name.lower():
-            found_doc = name
-            break
+    found_doc = documents_cache.resolve_name(doc_name)
     
     if not found_doc:
         await update.message.reply_text(
@@ -933,11 +919,10 @@ async def summary_doc(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     try:
-        content = documents_cache[found_doc]
-        words = len(content.split())
+        words = documents_cache.word_count(found_doc)
         
         # Prendre seulement le début pour un résumé rapide
-        content_preview = content[:3000] if len(content) > 3000 else content
+        content_preview = documents_cache.passage(found_doc, 0, 3000)
         
         prompt = f"""Fais un résumé CONCIS de ce document en utilisant ce format :
 
@@ -1050,40 +1035,24 @@ async def answer_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if documents_cache:
             # Construire le contexte avec recherche intelligente
             context_text = ""
-            question_lower = question.lower()
+            # Termes de la question : sans accents, élisions ni mots vides
+            terms = analyze(question)
             
-            # D'abord, chercher les documents les plus pertinents
-            relevant_docs = []
-            for doc_name, content in documents_cache.items():
-                content_lower = content.lower()
-                # Score de pertinence basé sur les mots de la question
-                relevance_score = 0
-                for word in question_lower.split():
-                    if len(word) > 3:  # Ignorer les petits mots
-                        relevance_score += content_lower.count(word)
-                
-                if relevance_score > 0:
-                    relevant_docs.append((doc_name, content, relevance_score))
-            
-            # Trier par pertinence
-            relevant_docs.sort(key=lambda x: x[2], reverse=True)
+            # D'abord, classer les documents par pertinence (BM25 sur l'index inversé)
+            relevant_docs = documents_cache.rank(terms, limit=3)
             
             # Prendre les documents les plus pertinents (max 3)
-            for doc_name, content, score in relevant_docs[:3]:
-                # Extraire plus de contexte autour des mots clés
-                extract_length = min(3000, len(content))
+            for doc_name, score in relevant_docs:
+                multi_page = documents_cache.page_count(doc_name) > 1
                 
-                # Chercher les passages pertinents
+                # Les passages où les termes sont les plus denses
                 passages = []
-                for word in question_lower.split():
-                    if len(word) > 3:
-                        index = content_lower.find(word)
-                        if index != -1:
-                            start = max(0, index - 500)
-                            end = min(len(content), index + 1000)
-                            passage = content[start:end]
-                            if passage not in passages:
-                                passages.append(passage)
+                for hit in documents_cache.passages(doc_name, terms, limit=3):
+                    passage = documents_cache.passage(doc_name, hit['start'], hit['end'])
+                    if multi_page:
+                        # Page réelle, pour que les citations soient exactes
+                        passage = f"(page {hit['page']}) {passage}"
+                    passages.append(passage)
                 
                 if passages:
                     context_text += f"\n=== Document: {doc_name} ===\n"
@@ -1091,12 +1060,14 @@ async def answer_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     context_text += "\n"
                 else:
                     # Si pas de passages spécifiques, prendre le début
-                    context_text += f"\n=== Document: {doc_name} ===\n{content[:extract_length]}\n"
+                    context_text += f"\n=== Document: {doc_name} ===\n{documents_cache.passage(doc_name, 0, 3000)}\n"
             
             # Si aucun document pertinent, prendre tous les documents
             if not relevant_docs:
-                for doc_name, content in documents_cache.items():
-                    preview = content[:1500] + "..." if len(content) > 1500 else content
+                for doc_name in documents_cache.keys():
+                    preview = documents_cache.passage(doc_name, 0, 1500)
+                    if documents_cache.char_length(doc_name) > 1500:
+                        preview += "..."
                     context_text += f"\n=== Document: {doc_name} ===\n{preview}\n"
             
             prompt = f"""Tu es un assistant spécialisé qui DOIT répondre PRÉCISÉMENT aux questions en utilisant UNIQUEMENT les documents fournis.
@@ -1177,6 +1148,21 @@ _Besoin d'aide ? Utilise `/help`_"""
             parse_mode='Markdown'
         )
 
+# Synchronisation périodique en tâche de fond (sans job-queue)
+async def post_init(application: Application):
+    """Lance la boucle de synchronisation une fois le bot démarré"""
+    if SYNC_INTERVAL_MINUTES > 0:
+        application.bot_data['sync_task'] = asyncio.create_task(
+            github_sync.run_periodic(documents_cache, interval=SYNC_INTERVAL_MINUTES * 60)
+        )
+        logger.info(f"🔁 Synchronisation périodique toutes les {SYNC_INTERVAL_MINUTES:g} min")
+
+async def post_shutdown(application: Application):
+    """Arrête la boucle de synchronisation"""
+    task = application.bot_data.get('sync_task')
+    if task:
+        task.cancel()
+
 # Fonction principale
 def main():
     """Démarrer le bot"""
@@ -1185,14 +1171,20 @@ def main():
     
     try:
         # Créer l'application
-        app = Application.builder().token(TELEGRAM_TOKEN).build()
+        app = (
+            Application.builder()
+            .token(TELEGRAM_TOKEN)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
         
         # Ajouter les handlers - Commandes en français et anglais
         app.add_handler(CommandHandler("start", start))
         app.add_handler(CommandHandler("aide", help_github))
         app.add_handler(CommandHandler("help", help_github))
-        app.add_handler(CommandHandler("synchroniser", sync_github))
-        app.add_handler(CommandHandler("sync", sync_github))
+        app.add_handler(CommandHandler("synchroniser", sync_github, block=False))
+        app.add_handler(CommandHandler("sync", sync_github, block=False))
         app.add_handler(CommandHandler("liste", list_docs))
         app.add_handler(CommandHandler("list", list_docs))
         app.add_handler(CommandHandler("recherche", search_in_docs))
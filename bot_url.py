@@ -4,21 +4,34 @@ Bot Telegram qui lit des documents depuis des URLs
 """
 
 import os
-import requests
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from mistralai import Mistral
-import PyPDF2
-import io
 from dotenv import load_dotenv
+from services.document_store import DocumentStore
+from services.http_fetcher import HttpFetcher
+from services.pdf_extractor import PdfExtractor
+from services.text_cache import ExtractedTextCache
+from services.url_library import UrlLibrary
+from config import Config
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 MISTRAL_KEY = os.getenv("MISTRAL_API_KEY")
+MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
+PDF_BACKEND = Config.PDF_BACKEND  # Réglage commun (config.py) : auto, pypdf2, pdfplumber, pypdfium2 ou pymupdf
 
 mistral_client = Mistral(api_key=MISTRAL_KEY)
-documents_cache = {}
+documents_cache = DocumentStore()
+fetcher = HttpFetcher()
+pdf_extractor = PdfExtractor(cache=ExtractedTextCache(), backend=PDF_BACKEND)
+url_library = UrlLibrary(
+    documents_cache,
+    fetcher=fetcher,
+    extractor=pdf_extractor,
+    max_file_size=MAX_FILE_SIZE_MB * 1024 * 1024
+)
 
 # Commande /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -26,7 +39,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 🤖 Bot qui lit des documents depuis des URLs !
 
 📎 Comment ça marche :
-/add [URL] - Ajouter un document
+/add [URL...] - Ajouter un ou plusieurs documents
 /list - Voir les documents
 /clear - Effacer tout
 
@@ -40,31 +53,34 @@ Pose tes questions ! 💬
 # Commande /add
 async def add_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_text("❌ Donne-moi une URL !\nExemple : /add https://site.com/doc.pdf")
+        await update.message.reply_text(
+            "❌ Donne-moi une ou plusieurs URLs !\n"
+            "Exemple : /add https://site.com/doc.pdf https://site.com/cours.txt"
+        )
         return
     
-    url = context.args[0]
-    await update.message.reply_text(f"📥 Téléchargement de {url}...")
+    urls = context.args
+    await update.message.reply_text(f"📥 Téléchargement de {len(urls)} URL(s)...")
     
-    try:
-        response = requests.get(url)
-        filename = url.split('/')[-1]
-        
-        if url.endswith('.pdf'):
-            # Lire PDF
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(response.content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        else:
-            # Texte brut
-            text = response.text
-        
-        documents_cache[filename] = text
-        await update.message.reply_text(f"✅ Document '{filename}' ajouté !")
-        
-    except Exception as e:
-        await update.message.reply_text(f"❌ Erreur : {str(e)}")
+    # Téléchargements en parallèle, requêtes conditionnelles pour les URLs déjà ajoutées
+    results = await url_library.add_many(urls)
+    
+    labels = {
+        'added': "✅ ajouté",
+        'updated': "♻️ mis à jour",
+        'unchanged': "💤 inchangé",
+        'duplicate': "🔗 déjà présent",
+        'too_large': f"❌ trop gros (max {MAX_FILE_SIZE_MB} Mo)",
+        'error': "❌ erreur"
+    }
+    message = ""
+    for result in results:
+        name = result['name'] or result['url']
+        message += f"{labels[result['status']]} : {name}"
+        if result['status'] == 'error':
+            message += f" ({result['error']})"
+        message += "\n"
+    await update.message.reply_text(message)
 
 # Les autres commandes...
 async def list_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -78,6 +94,7 @@ async def list_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message)
 
 async def clear_docs(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    url_library.clear()
     documents_cache.clear()
     await update.message.reply_text("🗑️ Documents effacés !")
 
@@ -113,7 +130,7 @@ def main():
     app = Application.builder().token(TELEGRAM_TOKEN).build()
     
     app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("add", add_url))
+    app.add_handler(CommandHandler("add", add_url, block=False))
     app.add_handler(CommandHandler("list", list_docs))
     app.add_handler(CommandHandler("clear", clear_docs))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, answer_question))
@@ -23,8 +23,26 @@ class Config:
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
     
+    # Extraction PDF (0 = pas de pool de processus)
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 25))
+    TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", "text_cache")
+    # Pages testées avec chaque extracteur avant de choisir le meilleur
+    PDF_PROBE_PAGES = int(os.getenv("PDF_PROBE_PAGES", 3))
+    # Extracteur PDF, vérifié au démarrage : auto (sondage pour DocumentProcessor, le plus rapide
+    # des extracteurs installés pour les bots), pypdf2, pdfplumber, pypdfium2, pymupdf ou
+    # unstructured (DocumentProcessor seulement)
+    PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+    
+    # Google Drive : téléchargements simultanés et taille des chunks
+    DRIVE_DOWNLOAD_CONCURRENCY = int(os.getenv("DRIVE_DOWNLOAD_CONCURRENCY", 4))
+    DRIVE_CHUNK_SIZE_MB = int(os.getenv("DRIVE_CHUNK_SIZE_MB", 32))
+    # Fichiers en cours de traitement (téléchargement, extraction, indexation)
+    SYNC_MAX_IN_FLIGHT = int(os.getenv("SYNC_MAX_IN_FLIGHT", 8))
+    
     # Paths
     VECTOR_DB_PATH = "vector_db"
     DOWNLOADS_PATH = "downloads"
+    DRIVE_SYNC_STATE_PATH = "vector_db/drive_sync.json"
     CREDENTIALS_PATH = "credentials.json"
     TOKEN_PATH = "token.json"
\ No newline at end of file
@@ -7,6 +7,7 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters, C
 
 from config import Config
 from services.google_drive import GoogleDriveService
+from services.drive_sync import DriveSync
 from services.document_processor import DocumentProcessor
 from services.rag_engine import RAGEngine
 from services.llm_service import LLMService
@@ -24,6 +25,11 @@ class TelegramRAGBot:
         self.drive_service = GoogleDriveService()
         self.doc_processor = DocumentProcessor()
         self.rag_engine = RAGEngine()
+        self.drive_sync = DriveSync(
+            self.drive_service,
+            self.config.DRIVE_SYNC_STATE_PATH,
+            max_in_flight=self.config.SYNC_MAX_IN_FLIGHT
+        )
         self.llm_service = LLMService()
         
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -47,31 +53,35 @@ Ou envoyez-moi directement votre question!
         """Commande /sync pour synchroniser les documents"""
         await update.message.reply_text("🔄 Synchronisation des documents en cours...")
         
-        try:
-            # Récupérer les fichiers depuis Google Drive
-            files = await self.drive_service.list_files()
-            await update.message.reply_text(f"📁 {len(files)} fichiers trouvés")
+        # Pipeline par fichier : pendant qu'un fichier est extrait ou indexé,
+        # les suivants se téléchargent (parallélisme borné par DriveSync)
+        async def process(file):
+            # Télécharger le fichier
+            content = await self.drive_service.download_file(file['id'])
             
-            # Traiter chaque fichier
-            processed = 0
-            for file in files:
-                try:
-                    # Télécharger le fichier
-                    content = await self.drive_service.download_file(file['id'])
-                    
-                    # Extraire le texte
-                    text = await self.doc_processor.extract_text(content, file['name'])
-                    
-                    # Indexer dans la base vectorielle
-                    await self.rag_engine.add_document(text, file['name'], file['id'])
-                    
-                    processed += 1
-                except Exception as e:
-                    logger.error(f"Erreur lors du traitement de {file['name']}: {e}")
+            # Extraire le texte
+            text = await self.doc_processor.extract_text(content, file['name'])
             
-            await update.message.reply_text(
-                f"✅ Synchronisation terminée! {processed}/{len(files)} documents indexés."
+            # Remplacer l'ancienne version dans la base vectorielle
+            await self.rag_engine.remove_document(file['id'], save=False)
+            await self.rag_engine.add_document(text, file['name'], file['id'], save=False)
+        
+        async def remove(file_id):
+            await self.rag_engine.remove_document(file_id, save=False)
+        
+        try:
+            # Seuls les fichiers modifiés depuis la dernière fois sont traités
+            # (une seule sauvegarde de l'index pour toute la synchronisation)
+            result = await self.drive_sync.sync(process, remove, flush=self.rag_engine.save)
+            
+            message = (
+                f"✅ Synchronisation terminée! {len(result['added'])} ajoutés, "
+                f"{len(result['updated'])} mis à jour, {len(result['deleted'])} supprimés, "
+                f"{len(result['unchanged'])} inchangés."
             )
+            if result['errors']:
+                message += f"\n⚠️ {len(result['errors'])} erreurs: {', '.join(result['errors'][:5])}"
+            await update.message.reply_text(message)
             
         except Exception as e:
             logger.error(f"Erreur lors de la synchronisation: {e}")
@@ -144,7 +154,7 @@ Ou envoyez-moi directement votre question!
         
         # Ajouter les handlers
         application.add_handler(CommandHandler("start", self.start))
-        application.add_handler(CommandHandler("sync", self.sync_documents))
+        application.add_handler(CommandHandler("sync", self.sync_documents, block=False))
         application.add_handler(CommandHandler("ask", self.ask_question))
         application.add_handler(CommandHandler("status", self.status))
         
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from services.http_fetcher import LoopSemaphore
+
+logger = logging.getLogger(__name__)
+
+CHATPDF_ADD_URL = 'https://api.chatpdf.com/v1/sources/add-url'
+
+
+class ChatPdfRegistry:
+    """Sources ChatPDF indexées par hash du contenu (un contenu connu n'est pas ré-uploadé)"""
+
+    def __init__(self, api_key: str, path: str, max_concurrency: int = 4, timeout: float = 60.0):
+        self.api_key = api_key
+        self.path = path
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.session = requests.Session()
+        # {hash: {'source_id', 'url', 'name', 'uploaded_at'}}
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+        self._uploads: Dict[str, asyncio.Task] = {}
+        # {ancien sourceId: (hash, entrée)} des sources remplacées après un 404
+        self._replaced: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._limit = LoopSemaphore(self.max_concurrency)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Registre ChatPDF illisible, il sera reconstruit : {e}")
+            return {}
+
+    def _save(self):
+        # Écriture atomique : un crash ne laisse pas un registre à moitié écrit
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    def source_id(self, content_hash: str) -> Optional[str]:
+        """``sourceId`` connu pour un contenu, ou None"""
+        entry = self.entries.get(content_hash)
+        return entry['source_id'] if entry else None
+
+    def _post(self, url: str) -> requests.Response:
+        return self.session.post(
+            CHATPDF_ADD_URL,
+            headers={'x-api-key': self.api_key, 'Content-Type': 'application/json'},
+            json={'url': url},
+            timeout=self.timeout
+        )
+
+    async def _upload(self, content_hash: str, url: str, name: str) -> Optional[str]:
+        async with self._limit:
+            try:
+                response = await asyncio.to_thread(self._post, url)
+            except requests.RequestException as e:
+                logger.error(f"Erreur upload ChatPDF {name}: {e}")
+                return None
+        if response.status_code != 200:
+            logger.error(f"Erreur ChatPDF upload {name}: {response.status_code}")
+            return None
+
+        source_id = response.json()['sourceId']
+        self.entries[content_hash] = {
+            'source_id': source_id, 'url': url, 'name': name, 'uploaded_at': time.time()
+        }
+        self._save()
+        logger.info(f"PDF uploadé sur ChatPDF: {name} -> {source_id}")
+        return source_id
+
+    async def ensure(self, content_hash: str, url: str, name: str) -> Optional[str]:
+        """``sourceId`` d'un contenu, uploadé seulement s'il est inconnu"""
+        source_id = self.source_id(content_hash)
+        if source_id:
+            return source_id
+        if content_hash not in self._uploads:
+            task = asyncio.ensure_future(self._upload(content_hash, url, name))
+            self._uploads[content_hash] = task
+            task.add_done_callback(lambda _: self._uploads.pop(content_hash, None))
+        return await asyncio.shield(self._uploads[content_hash])
+
+    async def ensure_many(self, files: Dict[str, Tuple[str, str]]) -> Dict[str, str]:
+        """``{nom: (hash, url)}`` -> ``{nom: sourceId}`` (les échecs sont omis)"""
+        names = list(files)
+        source_ids = await asyncio.gather(
+            *(self.ensure(content_hash, url, name) for name, (content_hash, url) in files.items())
+        )
+        return {name: source_id for name, source_id in zip(names, source_ids) if source_id}
+
+    async def reupload(self, source_id: str) -> Optional[str]:
+        """Remplacer une source que ChatPDF ne connaît plus (404)"""
+        if source_id not in self._replaced:
+            content_hash = next(
+                (key for key, entry in self.entries.items() if entry['source_id'] == source_id), None
+            )
+            if content_hash is None:
+                return None
+            entry = self.entries.pop(content_hash)
+            self._replaced[source_id] = (content_hash, entry)
+            self._save()
+            logger.warning(f"Source ChatPDF {source_id} disparue, nouvel upload de {entry['name']}")
+        # Requêtes concurrentes sur la même source : un seul nouvel upload
+        content_hash, entry = self._replaced[source_id]
+        return await self.ensure(content_hash, entry['url'], entry['name'])
@@ -1,17 +1,46 @@
 import io
 import logging
 import asyncio
-from typing import Union
-import PyPDF2
-import pdfplumber
+from typing import Union, Optional
 from unstructured.partition.pdf import partition_pdf
 from unstructured.partition.docx import partition_docx
 from unstructured.partition.text import partition_text
 
+from config import Config
+from services.pdf_extractor import (
+    MIN_CHARS_PER_PAGE, PREFERRED_BACKENDS, PdfExtractor, available_backends, resolve_backend, text_quality
+)
+from services.text_cache import ExtractedTextCache, content_hash
+
 logger = logging.getLogger(__name__)
 
 class DocumentProcessor:
-    def __init__(self):
+    # À incrémenter quand le texte produit change (invalide le cache disque)
+    VERSION = 2
+    # Extracteurs comparés sur les premières pages (s'ils sont installés), du plus rapide
+    # au plus lent, et version de la sélection
+    PDF_BACKENDS = PREFERRED_BACKENDS
+    SELECTOR_VERSION = 2
+    # Un extracteur plus rapide est retenu s'il atteint cette fraction du meilleur score
+    ACCEPTABLE_QUALITY = 0.9
+    
+    def __init__(self, pdf_extractor: Optional[PdfExtractor] = None):
+        self.config = Config()
+        self.text_cache = ExtractedTextCache(self.config.TEXT_CACHE_DIR)
+        self.pdf_extractor = pdf_extractor or PdfExtractor(
+            max_workers=self.config.PDF_WORKERS,
+            pages_per_task=self.config.PDF_PAGES_PER_TASK
+        )
+        installed = available_backends()
+        self.pdf_backends = [name for name in self.PDF_BACKENDS if name in installed]
+        # Un extracteur imposé est vérifié ici, pas au premier PDF
+        backend = self.config.PDF_BACKEND
+        if backend not in ('auto', 'unstructured') + self.PDF_BACKENDS:
+            raise ValueError(
+                f"PDF_BACKEND inconnu : {backend} (auto, unstructured, {', '.join(self.PDF_BACKENDS)})"
+            )
+        if backend in self.PDF_BACKENDS:
+            resolve_backend(backend)
         self.supported_formats = {
             'application/pdf': self._process_pdf,
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document': self._process_docx,
@@ -25,8 +54,20 @@ class DocumentProcessor:
         if mime_type not in self.supported_formats:
             raise ValueError(f"Format non supporté: {mime_type}")
         
-        processor = self.supported_formats[mime_type]
-        return await processor(content)
+        # Des octets déjà extraits ne sont pas reparsés (même après redémarrage)
+        sha256 = await asyncio.to_thread(content_hash, content)
+        version = f"processor-{filename.lower().split('.')[-1]}-v{self.VERSION}"
+        cached = await asyncio.to_thread(self.text_cache.get, sha256, version)
+        if cached is not None:
+            logger.info(f"Texte de {filename} lu depuis le cache")
+            return "".join(cached)
+        
+        if mime_type == 'application/pdf':
+            text = await self._process_pdf(content, sha256)
+        else:
+            text = await self.supported_formats[mime_type](content)
+        await asyncio.to_thread(self.text_cache.put, sha256, version, [text])
+        return text
     
     def _get_mime_type(self, filename: str) -> str:
         """Déterminer le type MIME basé sur l'extension"""
@@ -38,49 +79,67 @@ class DocumentProcessor:
         }
         return mime_map.get(ext, 'unknown')
     
-    async def _process_pdf(self, content: bytes) -> str:
-        """Extraire le texte d'un PDF"""
+    async def _process_pdf(self, content: bytes, sha256: Optional[str] = None) -> str:
+        """Extraire le texte d'un PDF avec le meilleur extracteur (un seul passage complet)"""
         try:
-            # Essayer d'abord avec pdfplumber (meilleur pour les tableaux)
-            text = await self._extract_with_pdfplumber(content)
-            if text and len(text.strip()) > 100:
-                return text
-            
-            # Si échec, utiliser PyPDF2
-            text = await self._extract_with_pypdf2(content)
-            if text and len(text.strip()) > 100:
-                return text
+            backend = await self._select_pdf_backend(content, sha256)
             
-            # En dernier recours, utiliser unstructured
-            return await self._extract_with_unstructured_pdf(content)
+            if backend == 'unstructured':
+                return await self._extract_with_unstructured_pdf(content)
+            if backend == 'pdfplumber':
+                return await self._extract_with_pdfplumber(content)
+            return await self.pdf_extractor.extract_text(content, backend=backend)
             
         except Exception as e:
             logger.error(f"Erreur lors de l'extraction PDF: {e}")
             raise
     
-    async def _extract_with_pdfplumber(self, content: bytes) -> str:
-        """Extraction avec pdfplumber"""
-        def extract():
-            text = ""
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text
+    async def _select_pdf_backend(self, content: bytes, sha256: Optional[str] = None) -> str:
+        """Choisir l'extracteur en sondant les premières pages (décision mise en cache).
+
+        ``PDF_BACKEND`` (config) impose un extracteur au lieu de sonder.
+        """
+        if self.config.PDF_BACKEND != 'auto':
+            return self.config.PDF_BACKEND
         
-        return await asyncio.to_thread(extract)
-    
-    async def _extract_with_pypdf2(self, content: bytes) -> str:
-        """Extraction avec PyPDF2"""
-        def extract():
-            text = ""
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(content_hash, content)
+        selector = f"pdf-backend-v{self.SELECTOR_VERSION}"
+        backend = await asyncio.to_thread(self.text_cache.get_choice, sha256, selector)
+        if backend:
+            return backend
         
-        return await asyncio.to_thread(extract)
+        probe_pages = self.config.PDF_PROBE_PAGES
+        probes = await asyncio.gather(*(
+            self.pdf_extractor.extract_range(content, name, 0, probe_pages)
+            for name in self.pdf_backends
+        ), return_exceptions=True)
+        
+        scores = {}
+        for name, probe in zip(self.pdf_backends, probes):
+            if isinstance(probe, Exception):
+                logger.warning(f"Sonde {name} en échec: {probe}")
+                continue
+            scores[name] = text_quality(probe[0])
+        
+        # Le plus rapide des extracteurs proches du meilleur score
+        best = max(scores.values(), default=0.0)
+        backend = next(
+            (name for name in self.pdf_backends if scores.get(name, -1) >= best * self.ACCEPTABLE_QUALITY),
+            'unstructured'
+        )
+        if best < MIN_CHARS_PER_PAGE:
+            # Pas de couche texte exploitable (PDF scanné) : unstructured
+            backend = 'unstructured'
+        logger.info(f"Extracteur PDF retenu: {backend} (scores: {scores})")
+        
+        await asyncio.to_thread(self.text_cache.put_choice, sha256, selector, backend)
+        return backend
+    
+    async def _extract_with_pdfplumber(self, content: bytes) -> str:
+        """Extraction avec pdfplumber (pool de processus)"""
+        pages = await self.pdf_extractor.extract_pages(content, backend='pdfplumber')
+        return "".join(page + "\n" for page in pages if page)
     
     async def _extract_with_unstructured_pdf(self, content: bytes) -> str:
         """Extraction avec unstructured"""
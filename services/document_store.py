@@ -0,0 +1,720 @@
+import os
+import mmap
+import asyncio
+import zlib
+import logging
+import tempfile
+from collections import OrderedDict
+from array import array
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from services.french_analyzer import fold
+from services.search_index import CorpusStatistics, TokenIndex
+from services.search_query import Phrase, evaluate, parse_query, span_offsets
+from services.substring_index import SuffixArray
+from services.text_normalizer import NormalizedText, normalize
+
+logger = logging.getLogger(__name__)
+
+# Un point de reprise caractère -> octet tous les CHECKPOINT_CHARS caractères
+CHECKPOINT_CHARS = 1024
+# Taille (en caractères) des segments compressés indépendamment
+SEGMENT_CHARS = 64 * 1024
+
+
+class Document(str):
+    """Texte d'un document (``str``) avec les offsets de début de ses pages"""
+
+    def __new__(cls, text: str = "", page_starts=None, metadata: Optional[Dict[str, Any]] = None):
+        document = super().__new__(cls, text)
+        document.page_starts = array('L', page_starts if page_starts is not None else [0])
+        document.metadata = metadata or {}
+        return document
+
+    def __reduce__(self):
+        return (Document, (str(self), self.page_starts, self.metadata))
+
+    @classmethod
+    def from_pages(cls, pages: List[str], metadata: Optional[Dict[str, Any]] = None) -> 'Document':
+        """Assembler des pages (un saut de ligne après chaque page)"""
+        page_starts = array('L')
+        position = 0
+        for page in pages:
+            page_starts.append(position)
+            position += len(page) + 1
+        return cls("".join(page + "\n" for page in pages), page_starts or [0], metadata)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_starts)
+
+    @property
+    def text(self) -> str:
+        """Le texte brut (``str``)"""
+        return str(self)
+
+    def page_at(self, offset: int) -> int:
+        """Numéro de la page qui contient l'offset ``offset``"""
+        return max(1, bisect_right(self.page_starts, offset))
+
+    def page_bounds(self, first: int, last: Optional[int] = None) -> Tuple[int, int]:
+        """Offsets ``[début, fin)`` des pages ``first`` à ``last`` incluses"""
+        last = first if last is None else last
+        if not 1 <= first <= last <= self.page_count:
+            raise IndexError(f"Pages {first}-{last} hors du document ({self.page_count} pages)")
+        end = self.page_starts[last] if last < self.page_count else len(self)
+        return self.page_starts[first - 1], end
+
+    def page_text(self, first: int, last: Optional[int] = None) -> str:
+        """Texte des pages ``first`` à ``last`` (seule la plage est copiée)"""
+        start, end = self.page_bounds(first, last)
+        return str.__getitem__(self, slice(start, end))
+
+
+class DocumentStore(MutableMapping):
+    """Documents chargés par nom, avec texte normalisé, index et statistiques BM25"""
+
+    def __init__(self, substring_index: bool = False):
+        self.substring_index = substring_index
+        self._documents: Dict[str, Document] = {}
+        self._normalized: Dict[str, NormalizedText] = {}
+        self._indexes: Dict[str, TokenIndex] = {}
+        self._statistics = CorpusStatistics()
+        self._suffix_arrays: Dict[str, SuffixArray] = {}
+
+    def __getitem__(self, name: str) -> Document:
+        return self._documents[name]
+
+    def __setitem__(self, name: str, document: str):
+        self.restore(name, *self.prepare(document))
+
+    def prepare(self, document: str) -> Tuple[Document, NormalizedText, TokenIndex, Optional[SuffixArray]]:
+        """Normaliser et indexer un document sans toucher au store (thread)"""
+        if not isinstance(document, Document):
+            document = Document(document)
+        normalized = NormalizedText.build(document)
+        index = TokenIndex.build(document, normalized)
+        suffixes = SuffixArray.build(normalized.text) if self.substring_index else None
+        return document, normalized, index, suffixes
+
+    async def add(self, name: str, document: str):
+        """Ajouter un document ; le travail coûteux tourne hors de la boucle
+        d'événements, seule l'insertion finale s'y fait"""
+        self.restore(name, *await asyncio.to_thread(self.prepare, document))
+
+    def _put(self, name: str, document: Document, normalized: NormalizedText):
+        self._documents[name] = document
+        self._normalized[name] = normalized
+
+    def restore(self, name: str, document: Document, normalized: NormalizedText, index: TokenIndex,
+                suffixes: Optional[SuffixArray] = None):
+        """Réinsérer un document déjà normalisé et indexé (snapshot)"""
+        self._drop_derived(name)
+        self._put(name, document, normalized)
+        self._indexes[name] = index
+        self._statistics.add(index)
+        if self.substring_index:
+            self._suffix_arrays[name] = suffixes or SuffixArray.build(normalized.text)
+
+    def _drop_derived(self, name: str):
+        self._normalized.pop(name, None)
+        self._suffix_arrays.pop(name, None)
+        index = self._indexes.pop(name, None)
+        if index is not None:
+            self._statistics.remove(index)
+
+    def entries(self) -> Iterator[Tuple[str, Document, NormalizedText, TokenIndex, Optional[SuffixArray]]]:
+        """``(nom, document, texte normalisé, index, table des suffixes ou None)``
+        de chaque document"""
+        for name in list(self):
+            try:
+                yield (name, self[name], self.normalized(name), self._indexes[name],
+                       self._suffix_arrays.get(name))
+            except KeyError:
+                # Supprimé pendant le parcours (synchronisation en cours)
+                continue
+
+    def __delitem__(self, name: str):
+        del self._documents[name]
+        self._drop_derived(name)
+
+    def clear(self):
+        self._documents.clear()
+        self._normalized.clear()
+        self._indexes.clear()
+        self._statistics.clear()
+        self._suffix_arrays.clear()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._documents)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def resolve_name(self, query: str) -> Optional[str]:
+        """Premier document dont le nom contient ``query``, sans tenir compte
+        des accents ni des majuscules (noms normalisés une seule fois)"""
+        query = fold(query)
+        return next((name for name in self if query in fold(name)), None)
+
+    def passage(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        """Texte ``[start, end)`` d'un document (offsets en caractères)"""
+        return str.__getitem__(self[name], slice(start, end))
+
+    def char_length(self, name: str) -> int:
+        """Longueur d'un document en caractères"""
+        return len(self[name])
+
+    def word_count(self, name: str) -> int:
+        """Nombre de mots d'un document"""
+        return len(self[name].split())
+
+    def _page_starts(self, name: str) -> array:
+        return self[name].page_starts
+
+    def page_at(self, name: str, offset: int) -> int:
+        """Numéro de la page qui contient l'offset ``offset`` d'un document"""
+        return max(1, bisect_right(self._page_starts(name), offset))
+
+    def page_count(self, name: str) -> int:
+        """Nombre de pages d'un document"""
+        return len(self._page_starts(name))
+
+    def page_text(self, name: str, first: int, last: Optional[int] = None) -> str:
+        """Texte des pages ``first`` à ``last`` incluses d'un document"""
+        page_starts = self._page_starts(name)
+        last = first if last is None else last
+        if not 1 <= first <= last <= len(page_starts):
+            raise IndexError(f"Pages {first}-{last} hors du document ({len(page_starts)} pages)")
+        end = page_starts[last] if last < len(page_starts) else None
+        return self.passage(name, page_starts[first - 1], end)
+
+    def normalized(self, name: str) -> NormalizedText:
+        """Texte normalisé d'un document (calculé à l'ajout)"""
+        return self._normalized[name]
+
+    def _normalized_passage(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        return self._normalized[name].text[start:end]
+
+    def _normalized_blocks(self, name: str) -> Iterator[Tuple[int, str]]:
+        # (offset, texte) consécutifs du texte normalisé ; ici, tout d'un bloc
+        yield 0, self._normalized[name].text
+
+    def _occurrences(self, name: str, query: str) -> Iterator[int]:
+        """Débuts des occurrences sans chevauchement d'une requête normalisée,
+        lues bloc par bloc (jamais le document entier d'un coup)"""
+        size = len(query)
+        if not size:
+            return
+        tail = ""
+        resume = 0
+        for offset, block in self._normalized_blocks(name):
+            # Les ``size - 1`` derniers caractères du bloc précédent : une
+            # occurrence à cheval sur deux blocs est trouvée dans le second
+            text = tail + block
+            base = offset - len(tail)
+            position = text.find(query, max(0, resume - base))
+            while position != -1:
+                yield base + position
+                resume = base + position + size
+                position = text.find(query, position + size)
+            tail = text[len(text) - size + 1:] if size > 1 else ""
+
+    def _to_original(self, name: str, offset: int) -> int:
+        return self._normalized[name].to_original(offset, lambda start, end: self.passage(name, start, end))
+
+    def find_all(self, name: str, query: str, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Occurrences ``[début, fin)`` (offsets originaux) d'une requête,
+        sans tenir compte des accents, majuscules et espaces"""
+        query = normalize(query)
+        suffixes = self._suffix_arrays.get(name)
+        if suffixes is not None:
+            starts = suffixes.locate(partial(self._normalized_passage, name), query, limit)
+        else:
+            starts = self._occurrences(name, query)
+        matches = []
+        for start in starts:
+            if limit is not None and len(matches) >= limit:
+                break
+            matches.append((self._to_original(name, start), self._to_original(name, start + len(query))))
+        return matches
+
+    def find(self, name: str, query: str) -> Optional[Tuple[int, int]]:
+        """Première occurrence d'une requête, ou None"""
+        matches = self.find_all(name, query, limit=1)
+        return matches[0] if matches else None
+
+    def count(self, name: str, query: str) -> int:
+        """Nombre d'occurrences d'une requête"""
+        query = normalize(query)
+        suffixes = self._suffix_arrays.get(name)
+        if suffixes is not None:
+            return suffixes.count(partial(self._normalized_passage, name), query)
+        return sum(1 for _ in self._occurrences(name, query))
+
+    def contains(self, name: str, query: str) -> bool:
+        query = normalize(query)
+        suffixes = self._suffix_arrays.get(name)
+        if suffixes is not None:
+            return suffixes.contains(partial(self._normalized_passage, name), query)
+        return next(self._occurrences(name, query), None) is not None
+
+    def search(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Chercher une requête dans tous les documents (index positionnel).
+
+        Phrases (mots entiers, même coupées par un saut de ligne ; seule, le
+        dernier mot peut être un début de mot), ``"phrase exacte"``, ``AND``, ``OR``,
+        ``NOT``/``-mot`` et ``NEAR/n`` (voir ``parse_query``), sans tenir
+        compte des accents ni des majuscules. Au plus ``limit`` occurrences
+        par document : ``{'document', 'line', 'page', 'start', 'end'}``
+        (offsets originaux, lignes et pages numérotées à partir de 1).
+        Avec ``substring_index``, un mot seul (sans guillemets ni opérateurs)
+        est cherché comme sous-chaîne, bouts de mots compris ; plusieurs mots
+        restent une phrase, trouvée aux mêmes offsets dans les deux modes.
+        Lève ``QueryError`` si la requête est mal formée.
+        """
+        parsed = parse_query(query)
+        # Plusieurs mots : le matcher de phrases, qui passe les sauts de ligne et de page
+        if self.substring_index and isinstance(parsed, Phrase) and parsed.prefix and len(parsed.tokens) == 1:
+            return self._search_substring(query, limit)
+        results = []
+        for name, index in list(self._indexes.items()):
+            passage = partial(self._normalized_passage, name)
+            spans = evaluate(parsed, index, passage, limit)
+            if not spans:
+                continue
+            multi_page = self.page_count(name) > 1
+            for span in spans:
+                start, end = span_offsets(span, index, passage)
+                start = self._to_original(name, start)
+                results.append({
+                    'document': name,
+                    'line': index.line_at(start),
+                    'page': self.page_at(name, start) if multi_page else None,
+                    'start': start,
+                    'end': self._to_original(name, end)
+                })
+        return results
+
+    def _search_substring(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        query = normalize(query)
+        results = []
+        for name, suffixes in list(self._suffix_arrays.items()):
+            index = self._indexes[name]
+            multi_page = self.page_count(name) > 1
+            found = 0
+            for position in suffixes.locate(partial(self._normalized_passage, name), query):
+                start = self._to_original(name, position)
+                end = self._to_original(name, position + len(query))
+                # Le texte normalisé n'a plus de sauts de ligne : comme l'ancienne
+                # recherche ligne par ligne, une occurrence à cheval est écartée
+                line = index.line_at(start)
+                if index.line_at(end - 1) != line:
+                    continue
+                results.append({
+                    'document': name,
+                    'line': line,
+                    'page': self.page_at(name, start) if multi_page else None,
+                    'start': start,
+                    'end': end
+                })
+                found += 1
+                if found == limit:
+                    break
+        return results
+
+    def rank(self, terms: Sequence[str], names: Optional[List[str]] = None,
+             limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Classer les documents par score BM25 pour des termes analysés
+        (``analyze``), du plus pertinent au moins pertinent ; les documents
+        sans aucun terme sont omis"""
+        if not terms:
+            return []
+        indexes = self._indexes
+        candidates = list(indexes) if names is None else [name for name in names if name in indexes]
+        scores = []
+        for name in candidates:
+            score = self._statistics.score(indexes[name], terms)
+            if score > 0:
+                scores.append((name, score))
+        scores.sort(key=lambda item: -item[1])
+        return scores[:limit] if limit is not None else scores
+
+    def passages(self, name: str, terms: Sequence[str], limit: int = 3,
+                 before: int = 500, after: int = 1000) -> List[Dict[str, Any]]:
+        """Meilleurs passages d'un document pour des termes analysés.
+
+        Les fenêtres de ``before + after`` caractères autour des occurrences
+        sont classées par BM25 ; chaque passage ``{'start', 'end', 'page',
+        'score'}`` (offsets originaux) va de ``before`` caractères avant sa
+        première occurrence à ``after`` caractères après.
+        """
+        windows = self._statistics.best_windows(self._indexes[name], terms, before + after, limit)
+        length = self.char_length(name)
+        multi_page = self.page_count(name) > 1
+        results = []
+        for score, offset in windows:
+            hit = self._to_original(name, offset)
+            results.append({
+                'start': max(0, hit - before),
+                'end': min(length, hit + after),
+                'page': self.page_at(name, hit) if multi_page else None,
+                'score': score
+            })
+        return results
+
+    def excerpt(self, name: str, start: int, end: int, lines: int = 1,
+                radius: int = 200) -> Tuple[str, str, str]:
+        """Extrait ``(avant, occurrence, après)`` : la ligne de l'occurrence
+        et ``lines`` lignes de part et d'autre, au plus ``radius`` caractères"""
+        before = self.passage(name, max(0, start - radius), start)
+        after = self.passage(name, end, end + radius)
+        cut = len(before)
+        for _ in range(lines + 1):
+            cut = before.rfind('\n', 0, cut)
+            if cut == -1:
+                break
+        if cut != -1:
+            before = before[cut + 1:]
+        cut = -1
+        for _ in range(lines + 1):
+            cut = after.find('\n', cut + 1)
+            if cut == -1:
+                break
+        if cut != -1:
+            after = after[:cut]
+        return before, self.passage(name, start, end), after
+
+
+class MmapDocumentStore(DocumentStore):
+    """Documents dans un fichier UTF-8 projeté en mémoire (mmap), décodés à la demande"""
+
+    def __init__(self, path: str = "corpus", substring_index: bool = False):
+        self.substring_index = substring_index
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        # {nom: (offset, octets, caractères, page_starts, checkpoints, metadata,
+        #        octets, caractères et checkpoints du texte normalisé)}
+        self._records: Dict[str, Tuple[int, int, int, array, array, Dict[str, Any], int, int, array]] = {}
+        # Calculé à l'ajout : compter les mots ne demande pas de décoder le document
+        self._word_counts: Dict[str, int] = {}
+        # Correspondances des offsets seulement : le texte normalisé est dans le fichier
+        self._normalized: Dict[str, NormalizedText] = {}
+        self._indexes: Dict[str, TokenIndex] = {}
+        self._statistics = CorpusStatistics()
+        self._suffix_arrays: Dict[str, SuffixArray] = {}
+        self._file = self._new_file()
+        self._size = 0
+        self._garbage = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    def _new_file(self):
+        # Fichier propre à ce store, supprimé dès l'ouverture : un autre processus
+        # lancé sur le même CORPUS_DIR ne peut pas tronquer des pages projetées ici
+        fd, path = tempfile.mkstemp(prefix="corpus-", suffix=".bin", dir=self.path)
+        os.unlink(path)
+        return os.fdopen(fd, 'w+b')
+
+    def _map(self) -> memoryview:
+        # Re-projection paresseuse après des ajouts ; les anciennes vues restent valides
+        if self._mapped_size != self._size:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ) if self._size else None
+            self._mapped_size = self._size
+        return memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+
+    @staticmethod
+    def _checkpoints(text: str) -> array:
+        checkpoints = array('Q')
+        position = 0
+        for start in range(0, len(text), CHECKPOINT_CHARS):
+            checkpoints.append(position)
+            position += len(text[start:start + CHECKPOINT_CHARS].encode('utf-8'))
+        return checkpoints
+
+    def _put(self, name: str, document: Document, normalized: NormalizedText):
+        if name in self._records:
+            self._forget(name)
+
+        data = str(document).encode('utf-8')
+        normalized_data = normalized.text.encode('utf-8')
+        self._file.seek(self._size)
+        self._file.write(data)
+        self._file.write(normalized_data)
+        self._records[name] = (
+            self._size, len(data), len(document),
+            document.page_starts, self._checkpoints(document), document.metadata,
+            len(normalized_data), len(normalized.text), self._checkpoints(normalized.text)
+        )
+        self._word_counts[name] = len(document.split())
+        self._normalized[name] = NormalizedText("", normalized.original_marks, normalized.normalized_marks)
+        self._size += len(data) + len(normalized_data)
+
+    def _forget(self, name: str):
+        record = self._records.pop(name)
+        self._garbage += record[1] + record[6]
+        del self._word_counts[name]
+        self._drop_derived(name)
+
+    def __delitem__(self, name: str):
+        self._forget(name)
+        if self._garbage > self._size // 2:
+            self.compact()
+
+    def __getitem__(self, name: str) -> Document:
+        offset, length, _, page_starts, _, metadata = self._records[name][:6]
+        text = str(self._map()[offset:offset + length], 'utf-8')
+        return Document(text, page_starts, metadata)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, name) -> bool:
+        return name in self._records
+
+    def clear(self):
+        self._records.clear()
+        self._word_counts.clear()
+        self._normalized.clear()
+        self._indexes.clear()
+        self._statistics.clear()
+        self._suffix_arrays.clear()
+        # Pas de truncate : une vue encore tenue sur l'ancienne projection
+        # provoquerait un SIGBUS ; comme ``compact``, un nouveau fichier
+        self._file.close()
+        self._file = self._new_file()
+        self._size = 0
+        self._garbage = 0
+        self._mapped_size = -1
+
+    def char_length(self, name: str) -> int:
+        return self._records[name][2]
+
+    def word_count(self, name: str) -> int:
+        return self._word_counts[name]
+
+    def view(self, name: str) -> memoryview:
+        """Octets UTF-8 d'un document, sans copie"""
+        offset, length = self._records[name][:2]
+        return self._map()[offset:offset + length]
+
+    @staticmethod
+    def _byte_offset(view: memoryview, chars: int, checkpoints: array, char_offset: int) -> int:
+        if char_offset >= chars:
+            return len(view)
+        index = char_offset // CHECKPOINT_CHARS
+        position = checkpoints[index]
+        remaining = char_offset - index * CHECKPOINT_CHARS
+        if remaining:
+            # Au plus CHECKPOINT_CHARS caractères décodés pour trouver l'octet exact
+            chunk = bytes(view[position:position + 4 * remaining])
+            position += len(chunk.decode('utf-8', errors='ignore')[:remaining].encode('utf-8'))
+        return position
+
+    def _decode(self, offset: int, length: int, chars: int, checkpoints: array,
+                start: int, end: Optional[int]) -> str:
+        start = max(0, min(start, chars))
+        end = chars if end is None else max(start, min(end, chars))
+        view = self._map()[offset:offset + length]
+        first = self._byte_offset(view, chars, checkpoints, start)
+        last = self._byte_offset(view, chars, checkpoints, end)
+        return str(view[first:last], 'utf-8')
+
+    def passage(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        offset, length, chars, _, checkpoints = self._records[name][:5]
+        return self._decode(offset, length, chars, checkpoints, start, end)
+
+    def _normalized_passage(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        offset, length, *_, normalized_length, chars, checkpoints = self._records[name]
+        return self._decode(offset + length, normalized_length, chars, checkpoints, start, end)
+
+    def _normalized_blocks(self, name: str) -> Iterator[Tuple[int, str]]:
+        # Blocs alignés sur les checkpoints : aucun décodage pour trouver les octets
+        for start in range(0, self._records[name][7], SEGMENT_CHARS):
+            yield start, self._normalized_passage(name, start, start + SEGMENT_CHARS)
+
+    def normalized(self, name: str) -> NormalizedText:
+        marks = self._normalized[name]
+        return NormalizedText(self._normalized_passage(name), marks.original_marks, marks.normalized_marks)
+
+    def _page_starts(self, name: str) -> array:
+        return self._records[name][3]
+
+    def compact(self):
+        """Réécrire le fichier sans les documents supprimés"""
+        view = self._map()
+        new_file = self._new_file()
+        records = {}
+        position = 0
+        for name, (offset, length, *rest) in self._records.items():
+            size = length + rest[4]
+            new_file.write(view[offset:offset + size])
+            records[name] = (position, length, *rest)
+            position += size
+        view.release()
+
+        # Les vues déjà données gardent l'ancienne projection en vie
+        self._file.close()
+        self._file = new_file
+        self._records = records
+        self._size = position
+        self._garbage = 0
+        self._mapped_size = -1
+        logger.info(f"Corpus compacté : {position} octets")
+
+
+class CompressedDocumentStore(DocumentStore):
+    """Documents compressés par segments, avec un LRU des segments décompressés"""
+
+    def __init__(self, cache_chars: int = 4 * 1024 * 1024, codec: str = "auto",
+                 substring_index: bool = False):
+        self.substring_index = substring_index
+        self.cache_chars = cache_chars
+        self.codec = codec
+        if codec in ("auto", "zstd"):
+            try:
+                import zstandard
+                self._compress = zstandard.ZstdCompressor(level=3).compress
+                self._decompress = zstandard.ZstdDecompressor().decompress
+                self.codec = "zstd"
+            except ImportError:
+                if codec == "zstd":
+                    raise
+                self.codec = "zlib"
+        if self.codec == "zlib":
+            self._compress = lambda data: zlib.compress(data, 6)
+            self._decompress = zlib.decompress
+        # {nom: (id, segments, caractères, page_starts, mots, metadata,
+        #        segments et caractères du texte normalisé)}
+        self._records: Dict[str, Tuple[int, List[bytes], int, array, int, Dict[str, Any], List[bytes], int]] = {}
+        # Correspondances des offsets seulement : le texte normalisé est compressé
+        self._normalized: Dict[str, NormalizedText] = {}
+        self._indexes: Dict[str, TokenIndex] = {}
+        self._statistics = CorpusStatistics()
+        self._suffix_arrays: Dict[str, SuffixArray] = {}
+        self._next_id = 0
+        self._cache: 'OrderedDict[Tuple[int, bool, int], str]' = OrderedDict()
+        self._cached_chars = 0
+
+    def _segments(self, text: str) -> List[bytes]:
+        return [
+            self._compress(str.__getitem__(text, slice(start, start + SEGMENT_CHARS)).encode('utf-8'))
+            for start in range(0, len(text), SEGMENT_CHARS)
+        ]
+
+    def _put(self, name: str, document: Document, normalized: NormalizedText):
+        # Un nouvel identifiant : les segments en cache de l'ancienne version ne servent plus
+        self._next_id += 1
+        self._records[name] = (
+            self._next_id, self._segments(document), len(document),
+            document.page_starts, len(document.split()), document.metadata,
+            self._segments(normalized.text), len(normalized.text)
+        )
+        self._normalized[name] = NormalizedText("", normalized.original_marks, normalized.normalized_marks)
+
+    def __delitem__(self, name: str):
+        del self._records[name]
+        self._drop_derived(name)
+
+    def __getitem__(self, name: str) -> Document:
+        # Lecture complète : hors LRU, pour ne pas en chasser les segments chauds
+        _, segments, _, page_starts, _, metadata = self._records[name][:6]
+        text = "".join(self._decompress(segment).decode('utf-8') for segment in segments)
+        return Document(text, page_starts, metadata)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, name) -> bool:
+        return name in self._records
+
+    def clear(self):
+        self._records.clear()
+        self._normalized.clear()
+        self._indexes.clear()
+        self._statistics.clear()
+        self._suffix_arrays.clear()
+        self._cache.clear()
+        self._cached_chars = 0
+
+    def _segment(self, name: str, index: int, normalized: bool = False) -> str:
+        record = self._records[name]
+        key = (record[0], normalized, index)
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache.move_to_end(key)
+            return text
+
+        segments = record[6] if normalized else record[1]
+        text = self._decompress(segments[index]).decode('utf-8')
+        self._cache[key] = text
+        self._cached_chars += len(text)
+        while self._cached_chars > self.cache_chars and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_chars -= len(evicted)
+        return text
+
+    def _read(self, name: str, chars: int, start: int, end: Optional[int], normalized: bool) -> str:
+        start = max(0, min(start, chars))
+        end = chars if end is None else max(start, min(end, chars))
+        if start == end:
+            return ""
+
+        parts = []
+        for index in range(start // SEGMENT_CHARS, (end - 1) // SEGMENT_CHARS + 1):
+            offset = index * SEGMENT_CHARS
+            parts.append(self._segment(name, index, normalized)[max(0, start - offset):end - offset])
+        return "".join(parts)
+
+    def passage(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        return self._read(name, self._records[name][2], start, end, False)
+
+    def _normalized_passage(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        return self._read(name, self._records[name][7], start, end, True)
+
+    def _normalized_blocks(self, name: str) -> Iterator[Tuple[int, str]]:
+        # Un segment à la fois, hors LRU : un parcours complet n'en chasse pas les segments chauds
+        for index, segment in enumerate(self._records[name][6]):
+            yield index * SEGMENT_CHARS, self._decompress(segment).decode('utf-8')
+
+    def normalized(self, name: str) -> NormalizedText:
+        # Texte entier : hors LRU, comme ``store[name]``
+        marks = self._normalized[name]
+        text = "".join(self._decompress(segment).decode('utf-8') for segment in self._records[name][6])
+        return NormalizedText(text, marks.original_marks, marks.normalized_marks)
+
+    def char_length(self, name: str) -> int:
+        return self._records[name][2]
+
+    def word_count(self, name: str) -> int:
+        return self._records[name][4]
+
+    def _page_starts(self, name: str) -> array:
+        return self._records[name][3]
+
+    def compressed_size(self) -> int:
+        """Taille totale des segments compressés (octets)"""
+        return sum(len(segment) for record in self._records.values() for segment in record[1] + record[6])
+
+
+def create_document_store(kind: str = "memory", path: str = "corpus",
+                          substring_index: bool = False) -> DocumentStore:
+    """Créer le stockage des documents : ``memory`` (dict), ``mmap`` (fichier
+    projeté) ou ``compressed`` (segments compressés en mémoire)"""
+    if kind == "mmap":
+        return MmapDocumentStore(path, substring_index=substring_index)
+    if kind == "compressed":
+        return CompressedDocumentStore(substring_index=substring_index)
+    if kind != "memory":
+        raise ValueError(f"Stockage de documents inconnu : {kind}")
+    return DocumentStore(substring_index=substring_index)
@@ -0,0 +1,152 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+from services.google_drive import GoogleDriveService
+
+logger = logging.getLogger(__name__)
+
+
+class DriveSync:
+    """Synchronisation incrémentale d'un dossier Google Drive (API Changes)"""
+
+    def __init__(self, drive_service: GoogleDriveService, state_path: str, max_in_flight: int = 8):
+        self.drive_service = drive_service
+        self.max_in_flight = max(1, max_in_flight)
+        self.state_path = state_path
+        self.folder_id = drive_service.config.GOOGLE_DRIVE_FOLDER_ID
+        self.state = self._load_state()
+        self._lock = asyncio.Lock()
+
+    def _load_state(self) -> Dict[str, Any]:
+        empty = {'folder_id': self.folder_id, 'page_token': None, 'files': {}}
+        if not os.path.exists(self.state_path):
+            return empty
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"État de synchronisation Drive illisible, resynchronisation complète: {e}")
+            return empty
+        # Changement de dossier : on repart de zéro
+        if state.get('folder_id') != self.folder_id:
+            return empty
+        return state
+
+    def _save_state(self):
+        # Écriture atomique : un crash ne laisse pas un état à moitié écrit
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def reset(self):
+        """Oublier l'état (la prochaine synchronisation sera complète)"""
+        self.state = {'folder_id': self.folder_id, 'page_token': None, 'files': {}}
+        self._save_state()
+
+    @staticmethod
+    def _fingerprint(file: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        return {
+            'name': file.get('name'),
+            'md5Checksum': file.get('md5Checksum'),
+            'modifiedTime': file.get('modifiedTime')
+        }
+
+    def _is_unchanged(self, file: Dict[str, Any]) -> bool:
+        known = self.state['files'].get(file['id'])
+        if not known:
+            return False
+        if file.get('md5Checksum') and known.get('md5Checksum'):
+            return known['md5Checksum'] == file['md5Checksum'] and known['name'] == file.get('name')
+        return known.get('modifiedTime') == file.get('modifiedTime')
+
+    async def _collect(self) -> Dict[str, Any]:
+        """Fichiers candidats, identifiants supprimés et prochain jeton"""
+        known = self.state['files']
+
+        if not self.state.get('page_token'):
+            # Jeton pris avant le listing : rien de ce qui change pendant n'est perdu
+            page_token = await self.drive_service.get_start_page_token()
+            files = await self.drive_service.list_files()
+            listed = {file['id'] for file in files}
+            return {
+                'files': files,
+                'deleted': [file_id for file_id in known if file_id not in listed],
+                'page_token': page_token
+            }
+
+        changes, page_token = await self.drive_service.list_changes(self.state['page_token'])
+        files: Dict[str, Dict[str, Any]] = {}
+        deleted = set()
+        for change in changes:
+            file_id = change['fileId']
+            file = change.get('file')
+            if change.get('removed') or not file or not self.drive_service.is_tracked(file):
+                # Retiré du dossier (ou d'un type non supporté)
+                files.pop(file_id, None)
+                if file_id in known:
+                    deleted.add(file_id)
+            else:
+                # Le dernier changement d'un fichier l'emporte
+                files[file_id] = file
+                deleted.discard(file_id)
+        return {'files': list(files.values()), 'deleted': sorted(deleted), 'page_token': page_token}
+
+    async def sync(self, process: Callable[[Dict[str, Any]], Awaitable[None]],
+                   remove: Callable[[str], Awaitable[None]],
+                   flush: Optional[Callable[[], Awaitable[None]]] = None) -> Dict[str, List[str]]:
+        """Appliquer les changements du dossier.
+
+        ``process(file)`` (ré)indexe un fichier, ``remove(file_id)`` le retire ;
+        ``flush()`` est appelé avant de sauvegarder l'état (sauvegarde de l'index).
+        """
+        # Deux /sync simultanés ne doivent pas se marcher dessus
+        async with self._lock:
+            return await self._sync(process, remove, flush)
+
+    async def _sync(self, process, remove, flush) -> Dict[str, List[str]]:
+        delta = await self._collect()
+        result = {'added': [], 'updated': [], 'deleted': [], 'unchanged': [], 'errors': []}
+        known = self.state['files']
+
+        for file_id in delta['deleted']:
+            try:
+                await remove(file_id)
+                entry = known.pop(file_id)
+                result['deleted'].append(entry['name'])
+                logger.info(f"Document supprimé : {entry['name']}")
+            except Exception as e:
+                logger.error(f"Erreur lors de la suppression de {file_id}: {e}")
+                result['errors'].append(known[file_id]['name'])
+
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def load(file: Dict[str, Any]):
+            updated = file['id'] in known
+            try:
+                async with semaphore:
+                    await process(file)
+                known[file['id']] = self._fingerprint(file)
+                result['updated' if updated else 'added'].append(file['name'])
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement de {file['name']}: {e}")
+                result['errors'].append(file['name'])
+
+        changed = []
+        for file in delta['files']:
+            if self._is_unchanged(file):
+                result['unchanged'].append(file['name'])
+            else:
+                changed.append(file)
+        await asyncio.gather(*(load(file) for file in changed))
+
+        if flush:
+            await flush()
+        if not result['errors']:
+            self.state['page_token'] = delta['page_token']
+        self._save_state()
+        return result
@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+from typing import Tuple
+
+from services.text_normalizer import normalize
+
+# Un token : une suite de lettres ou de chiffres du texte normalisé
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Articles et pronoms élidés : "l'élève", "d'accord", "qu'il", "jusqu'à"...
+ELISION = re.compile(r"\b(?:l|d|qu|j|m|n|s|t|c|jusqu|lorsqu|puisqu|quoiqu)'")
+
+# Mots vides, sous forme normalisée (minuscules, sans accents)
+FRENCH_STOPWORDS = frozenset("""
+a ai au aux avec avoir c ca ce ceci cela celle celles celui ces cet cette ceux chaque
+comme comment d dans de des donc du elle elles en est et etaient etait ete etre eu
+eux il ils j je l la le les leur leurs lui m ma mais me meme mes moi mon n ne ni
+nos notre nous on ont ou par pas peu peut plus pour pourquoi qu quand que quel quelle
+quelles quels qui quoi s sa sans se ses si son sont sur t ta te tes toi ton tous tout
+toute toutes tres tu un une vos votre vous y
+""".split())
+
+
+@lru_cache(maxsize=4096)
+def fold(text: str) -> str:
+    """``normalize`` mis en cache, pour les textes courts et répétés (noms de
+    documents, messages, requêtes) : sans accents ni majuscules"""
+    return normalize(text)
+
+
+@lru_cache(maxsize=1024)
+def analyze(text: str) -> Tuple[str, ...]:
+    """Termes de recherche d'un texte français : normalisé, sans élisions ni
+    mots vides (l'ordre est conservé, les doublons aussi)"""
+    text = ELISION.sub(' ', fold(text))
+    return tuple(
+        token for token in TOKEN_PATTERN.findall(text)
+        if token not in FRENCH_STOPWORDS and (len(token) > 1 or token.isdigit())
+    )
+
+
+@lru_cache(maxsize=65536)
+def light_stem(token: str) -> str:
+    """Racinisation légère d'un token normalisé : pluriel et féminin
+    ("securites", "securite" -> "securit" ; "generaux" -> "general").
+    Les tokens courts et les nombres sont laissés tels quels."""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith('aux') and len(token) > 4:
+        token = token[:-3] + 'al'
+    elif token[-1] in 'sx':
+        token = token[:-1]
+    if token.endswith('e') and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+@lru_cache(maxsize=4096)
+def stem_forms(stem: str) -> Tuple[str, ...]:
+    """Tokens qui mènent à la racine ``stem`` par ``light_stem`` (l'inverse :
+    la racine elle-même, ses formes en -e, -s, -x, -es, -ex et -aux)"""
+    candidates = [stem, stem + 'e', stem + 's', stem + 'x', stem + 'es', stem + 'ex']
+    if stem.endswith('al'):
+        candidates.append(stem[:-2] + 'aux')
+    return tuple(token for token in candidates if light_stem(token) == stem)
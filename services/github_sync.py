@@ -0,0 +1,321 @@
+import asyncio
+import fnmatch
+import hashlib
+import random
+import logging
+import tarfile
+import posixpath
+from urllib.parse import quote
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Sequence
+
+from services.document_store import Document, DocumentStore
+from services.http_fetcher import CHUNK_SIZE, HttpFetcher, SpooledDownload
+from services.pdf_extractor import PdfExtractor
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+DEFAULT_INCLUDE = tuple(f"*{ext}" for ext in SUPPORTED_EXTENSIONS)
+
+
+def git_blob_hasher(size: int):
+    """SHA de blob Git incrémental, pour un contenu lu par morceaux"""
+    return hashlib.sha1(b"blob %d\0" % size)
+
+
+def git_blob_sha(content: bytes) -> str:
+    """SHA de blob Git d'un contenu (identique au ``sha`` de l'API Trees)"""
+    sha = git_blob_hasher(len(content))
+    sha.update(content)
+    return sha.hexdigest()
+
+
+def parse_globs(value: Optional[str]) -> List[str]:
+    """Découper une liste de globs séparés par des virgules (variable d'env)"""
+    return [glob.strip() for glob in (value or "").split(",") if glob.strip()]
+
+
+class GitHubSyncError(Exception):
+    """Erreur renvoyée par l'API GitHub lors du listing"""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"Erreur GitHub {status_code}")
+        self.status_code = status_code
+
+
+class GitHubSync:
+    """Synchronisation incrémentale d'un repository GitHub (SHA de blob par fichier)"""
+
+    MODES = ('api', 'archive', 'auto')
+
+    def __init__(self, repo: str, token: Optional[str] = None, max_concurrency: int = 8,
+                 fetcher: Optional[HttpFetcher] = None, extractor: Optional[PdfExtractor] = None,
+                 branch: str = "main", include: Optional[Sequence[str]] = None,
+                 exclude: Optional[Sequence[str]] = None, max_file_size: Optional[int] = None,
+                 mode: str = 'api'):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode de synchronisation inconnu : {mode}")
+        self.repo = repo
+        self.mode = mode
+        self.token = token
+        self.branch = branch
+        self.include = [glob.lower() for glob in (include or DEFAULT_INCLUDE)]
+        self.exclude = [glob.lower() for glob in (exclude or ())]
+        self.max_file_size = max_file_size
+        self.fetcher = fetcher or HttpFetcher(max_concurrency=max_concurrency)
+        self.extractor = extractor or PdfExtractor()
+        self.manifest: Dict[str, Dict[str, str]] = {}
+        self._lock = asyncio.Lock()
+        self._tree_etag: Optional[str] = None
+        self._tree_files: List[Dict[str, Any]] = []
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Verrou des synchronisations : tant qu'il est tenu, ni ``documents`` ni le
+        manifeste ne changent (ex. : écriture d'un snapshot)"""
+        return self._lock
+
+    def export_state(self) -> Dict[str, Any]:
+        """Manifeste et listing en cache, pour un snapshot"""
+        return {
+            'repo': self.repo,
+            'branch': self.branch,
+            'include': self.include,
+            'exclude': self.exclude,
+            'manifest': {path: dict(entry) for path, entry in self.manifest.items()},
+            'tree_etag': self._tree_etag,
+            'tree_files': list(self._tree_files)
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> bool:
+        """Reprendre un état exporté ; False s'il vient d'une autre configuration"""
+        settings = (self.repo, self.branch, self.include, self.exclude)
+        if (state.get('repo'), state.get('branch'), state.get('include'), state.get('exclude')) != settings:
+            return False
+        self.manifest = state['manifest']
+        self._tree_etag = state['tree_etag']
+        self._tree_files = state['tree_files']
+        return True
+
+    def _auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"token {self.token}"} if self.token else {}
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Accept": "application/vnd.github.v3+json", **self._auth_headers()}
+
+    async def extract_document(self, name: str, download: SpooledDownload) -> Document:
+        """Extraire le texte d'un fichier téléchargé (avec ses pages pour un PDF) ;
+        son dossier dans le repository va dans ``metadata['dir']``"""
+        metadata = {'dir': posixpath.dirname(name)}
+        if name.lower().endswith('.pdf'):
+            pages = await self.extractor.extract_pages(download.source(), sha256=download.sha256)
+            return Document.from_pages(pages, metadata)
+        return Document(download.read().decode('utf-8', errors='replace'), metadata=metadata)
+
+    def raw_url(self, path: str) -> str:
+        """URL de téléchargement direct d'un fichier du repository"""
+        return f"https://raw.githubusercontent.com/{self.repo}/{quote(self.branch)}/{quote(path)}"
+
+    def _accept(self, path: str, size: Optional[int]) -> bool:
+        path_lower = path.lower()
+        if not any(fnmatch.fnmatch(path_lower, glob) for glob in self.include):
+            return False
+        if any(fnmatch.fnmatch(path_lower, glob) for glob in self.exclude):
+            return False
+        if self.max_file_size and size and size > self.max_file_size:
+            logger.warning(f"Fichier ignoré (trop gros, {size} octets) : {path}")
+            return False
+        return True
+
+    async def list_files(self) -> List[Dict[str, Any]]:
+        """Lister récursivement les fichiers retenus du repository"""
+        url = f"https://api.github.com/repos/{self.repo}/git/trees/{quote(self.branch)}?recursive=1"
+        headers = self._headers()
+        if self._tree_etag:
+            headers["If-None-Match"] = self._tree_etag
+        response = await self.fetcher.get(url, headers=headers)
+
+        if response.status_code == 304:
+            logger.info("Repository inchangé (304)")
+            return self._tree_files
+        if response.status_code != 200:
+            raise GitHubSyncError(response.status_code)
+
+        tree = response.json()
+        if tree.get('truncated'):
+            logger.warning("Arborescence GitHub tronquée par l'API : certains fichiers manquent")
+
+        self._tree_files = [
+            {
+                'path': item['path'],
+                'name': posixpath.basename(item['path']),
+                'dir': posixpath.dirname(item['path']),
+                'sha': item['sha'],
+                'size': item.get('size'),
+                'download_url': self.raw_url(item['path'])
+            }
+            for item in tree.get('tree', [])
+            if item.get('type') == 'blob' and self._accept(item['path'], item.get('size'))
+        ]
+        self._tree_etag = response.headers.get('ETag')
+        return self._tree_files
+
+    async def sync(self, documents: DocumentStore, mode: Optional[str] = None) -> Dict[str, List[str]]:
+        """Appliquer le delta entre le repository et ``documents``"""
+        mode = mode or self.mode
+        if mode == 'auto':
+            mode = 'api' if self.manifest else 'archive'
+
+        # Deux /sync simultanés ne doivent pas se marcher dessus
+        async with self._lock:
+            if mode == 'archive':
+                return await self._sync_archive(documents)
+            return await self._sync(documents)
+
+    async def run_periodic(self, documents: DocumentStore, interval: float, jitter: float = 0.1,
+                           on_change: Optional[Callable[[Dict[str, List[str]]], Awaitable[None]]] = None):
+        """Synchroniser en tâche de fond toutes les ``interval`` secondes (± jitter)"""
+        while True:
+            await asyncio.sleep(interval * (1 + random.uniform(-jitter, jitter)))
+            # Une erreur (sync ou on_change) ne doit pas arrêter la tâche de fond
+            try:
+                result = await self.sync(documents)
+                if result['added'] or result['updated'] or result['deleted']:
+                    logger.info(
+                        f"Synchronisation périodique : {len(result['added'])} ajoutés, "
+                        f"{len(result['updated'])} modifiés, {len(result['deleted'])} supprimés"
+                    )
+                    if on_change:
+                        await on_change(result)
+            except Exception as e:
+                logger.error(f"Erreur synchronisation périodique : {e}")
+
+    def _new_result(self) -> Dict[str, List[str]]:
+        return {'added': [], 'updated': [], 'deleted': [], 'unchanged': [], 'errors': []}
+
+    def _drop_missing(self, documents: DocumentStore, remote_paths, result: Dict[str, List[str]]):
+        """Retirer les documents dont le fichier a disparu du repository"""
+        for path in list(self.manifest):
+            if path not in remote_paths:
+                entry = self.manifest.pop(path)
+                documents.pop(entry['doc'], None)
+                result['deleted'].append(entry['doc'])
+                logger.info(f"Document supprimé : {entry['doc']}")
+
+    def _is_unchanged(self, documents: DocumentStore, path: str, sha: str) -> bool:
+        entry = self.manifest.get(path)
+        return bool(entry) and entry['sha'] == sha and entry['doc'] in documents
+
+    async def _ingest(self, documents: DocumentStore, result: Dict[str, List[str]],
+                      path: str, sha: str, download: SpooledDownload):
+        """Parser un fichier et l'enregistrer dans ``documents`` et le manifeste"""
+        updated = path in self.manifest
+        with download:
+            document = await self.extract_document(path, download)
+        await documents.add(path, document)
+        self.manifest[path] = {'sha': sha, 'doc': path, 'dir': posixpath.dirname(path)}
+        result['updated' if updated else 'added'].append(path)
+        logger.info(f"Document chargé : {path}")
+
+    async def _sync(self, documents: DocumentStore) -> Dict[str, List[str]]:
+        remote = {item['path']: item for item in await self.list_files()}
+        result = self._new_result()
+
+        # Fichiers supprimés du repository
+        self._drop_missing(documents, remote, result)
+
+        changed = []
+        for path, item in remote.items():
+            if self._is_unchanged(documents, path, item['sha']):
+                result['unchanged'].append(path)
+            else:
+                changed.append(item)
+
+        async def load(item: Dict[str, Any]):
+            try:
+                download = await self.fetcher.download(
+                    item['download_url'], headers=self._auth_headers(), max_size=self.max_file_size
+                )
+                await self._ingest(documents, result, item['path'], item['sha'], download)
+            except Exception as e:
+                logger.error(f"Erreur avec {item['path']}: {e}")
+                result['errors'].append(item['path'])
+
+        await asyncio.gather(*(load(item) for item in changed))
+        return result
+
+    def _read_archive(self, emit):
+        """Lire le tarball en flux et appeler ``emit(path, sha, download)`` (thread)"""
+        url = f"https://api.github.com/repos/{self.repo}/tarball/{quote(self.branch)}"
+        with self.fetcher.session.get(url, headers=self._headers(), stream=True,
+                                      timeout=self.fetcher.timeout) as response:
+            if response.status_code != 200:
+                raise GitHubSyncError(response.status_code)
+
+            with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    # Les entrées sont préfixées par "owner-repo-commit/"
+                    path = member.name.split('/', 1)[-1]
+                    if not self._accept(path, member.size):
+                        continue
+
+                    # Copie par morceaux : le SHA Git est calculé au passage
+                    sha = git_blob_hasher(member.size)
+                    download = SpooledDownload(self.fetcher.spool_size, self.max_file_size)
+                    stream = archive.extractfile(member)
+                    try:
+                        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                            sha.update(chunk)
+                            download.write(chunk)
+                        download.finish()
+                    except BaseException:
+                        download.close()
+                        raise
+                    emit(path, sha.hexdigest(), download)
+
+    async def _sync_archive(self, documents: DocumentStore) -> Dict[str, List[str]]:
+        loop = asyncio.get_running_loop()
+        # File bornée et workers en nombre fixe : au plus ``max_concurrency``
+        # fichiers en parsing et autant en attente, la lecture de l'archive attend
+        workers = self.fetcher.max_concurrency
+        queue = asyncio.Queue(maxsize=workers)
+        done = object()
+
+        def emit(path, sha, download):
+            asyncio.run_coroutine_threadsafe(queue.put((path, sha, download)), loop).result()
+
+        def read():
+            try:
+                self._read_archive(emit)
+            finally:
+                for _ in range(workers):
+                    asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+        reader = asyncio.ensure_future(asyncio.to_thread(read))
+        result = self._new_result()
+        seen = set()
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                path, sha, download = item
+                seen.add(path)
+                if self._is_unchanged(documents, path, sha):
+                    download.close()
+                    result['unchanged'].append(path)
+                    continue
+                try:
+                    await self._ingest(documents, result, path, sha, download)
+                except Exception as e:
+                    logger.error(f"Erreur avec {path}: {e}")
+                    result['errors'].append(path)
+
+        await asyncio.gather(*(work() for _ in range(workers)))
+        # Propage les erreurs de lecture avant de supprimer quoi que ce soit
+        await reader
+        self._drop_missing(documents, seen, result)
+        return result
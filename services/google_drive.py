@@ -1,7 +1,9 @@
 import os
 import io
 import asyncio
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
@@ -14,10 +16,26 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_MIME_TYPES = (
+    'application/pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'text/plain'
+)
+FILE_FIELDS = "id, name, mimeType, modifiedTime, md5Checksum, parents, trashed"
+
 class GoogleDriveService:
     def __init__(self):
         self.config = Config()
         self.service = None
+        self.creds = None
+        self.chunk_size = self.config.DRIVE_CHUNK_SIZE_MB * 1024 * 1024
+        # Le client HTTP de l'API n'est pas thread-safe : un client par thread
+        # de téléchargement, et un nombre borné de téléchargements simultanés
+        self._local = threading.local()
+        self._download_executor = ThreadPoolExecutor(
+            max_workers=self.config.DRIVE_DOWNLOAD_CONCURRENCY,
+            thread_name_prefix="drive-download"
+        )
         self._authenticate()
     
     def _authenticate(self):
@@ -44,25 +62,40 @@ class GoogleDriveService:
             with open(self.config.TOKEN_PATH, 'wb') as token:
                 pickle.dump(creds, token)
         
+        self.creds = creds
         self.service = build('drive', 'v3', credentials=creds)
         logger.info("Authentification Google Drive réussie")
     
+    def is_tracked(self, file: Dict[str, Any]) -> bool:
+        """Le fichier est-il un document supporté du dossier configuré ?"""
+        return (
+            not file.get('trashed')
+            and file.get('mimeType') in SUPPORTED_MIME_TYPES
+            and self.config.GOOGLE_DRIVE_FOLDER_ID in file.get('parents', [])
+        )
+    
     async def list_files(self) -> List[Dict[str, Any]]:
-        """Lister les fichiers dans le dossier configuré"""
+        """Lister les fichiers dans le dossier configuré (toutes les pages)"""
         try:
-            query = f"'{self.config.GOOGLE_DRIVE_FOLDER_ID}' in parents"
-            query += " and (mimeType='application/pdf'"
-            query += " or mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document'"
-            query += " or mimeType='text/plain')"
+            query = f"'{self.config.GOOGLE_DRIVE_FOLDER_ID}' in parents and trashed = false"
+            query += " and (" + " or ".join(f"mimeType='{mime}'" for mime in SUPPORTED_MIME_TYPES) + ")"
             
-            results = await asyncio.to_thread(
-                self.service.files().list(
-                    q=query,
-                    fields="files(id, name, mimeType, modifiedTime)"
-                ).execute
-            )
+            files = []
+            page_token = None
+            while True:
+                results = await asyncio.to_thread(
+                    self.service.files().list(
+                        q=query,
+                        pageSize=1000,
+                        pageToken=page_token,
+                        fields=f"nextPageToken, files({FILE_FIELDS})"
+                    ).execute
+                )
+                files.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
             
-            files = results.get('files', [])
             logger.info(f"{len(files)} fichiers trouvés dans Google Drive")
             return files
             
@@ -70,21 +103,69 @@ class GoogleDriveService:
             logger.error(f"Erreur lors de la liste des fichiers: {e}")
             raise
     
-    async def download_file(self, file_id: str) -> bytes:
-        """Télécharger un fichier depuis Google Drive"""
+    async def get_start_page_token(self) -> str:
+        """Jeton de départ de l'API Changes (état actuel du Drive)"""
+        try:
+            result = await asyncio.to_thread(self.service.changes().getStartPageToken().execute)
+            return result['startPageToken']
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération du jeton de changements: {e}")
+            raise
+    
+    async def list_changes(self, page_token: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Lister les changements depuis ``page_token`` (toutes les pages).
+        
+        Retourne les changements et le jeton à utiliser la prochaine fois.
+        """
         try:
-            request = self.service.files().get_media(fileId=file_id)
-            file_buffer = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_buffer, request)
+            changes = []
+            new_start_page_token: Optional[str] = None
+            while page_token:
+                results = await asyncio.to_thread(
+                    self.service.changes().list(
+                        pageToken=page_token,
+                        pageSize=1000,
+                        spaces='drive',
+                        fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))"
+                    ).execute
+                )
+                changes.extend(results.get('changes', []))
+                new_start_page_token = results.get('newStartPageToken', new_start_page_token)
+                page_token = results.get('nextPageToken')
             
-            done = False
-            while not done:
-                status, done = await asyncio.to_thread(downloader.next_chunk)
-                if status:
-                    logger.debug(f"Téléchargement {int(status.progress() * 100)}%")
+            logger.info(f"{len(changes)} changements dans Google Drive")
+            return changes, new_start_page_token
             
-            file_buffer.seek(0)
-            return file_buffer.read()
+        except Exception as e:
+            logger.error(f"Erreur lors de la liste des changements: {e}")
+            raise
+    
+    def _thread_service(self):
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self.creds)
+            self._local.service = service
+        return service
+    
+    def _download(self, file_id: str) -> bytes:
+        # Toute la boucle de chunks tourne dans le même thread
+        request = self._thread_service().files().get_media(fileId=file_id)
+        file_buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(file_buffer, request, chunksize=self.chunk_size)
+        
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+            if status:
+                logger.debug(f"Téléchargement {int(status.progress() * 100)}%")
+        
+        return file_buffer.getvalue()
+    
+    async def download_file(self, file_id: str) -> bytes:
+        """Télécharger un fichier depuis Google Drive (parallélisme borné)"""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._download_executor, self._download, file_id)
             
         except Exception as e:
             logger.error(f"Erreur lors du téléchargement du fichier {file_id}: {e}")
@@ -96,7 +177,7 @@ class GoogleDriveService:
             file = await asyncio.to_thread(
                 self.service.files().get(
                     fileId=file_id,
-                    fields="id, name, mimeType, modifiedTime, size"
+                    fields="id, name, mimeType, modifiedTime, md5Checksum, size"
                 ).execute
             )
             return file
@@ -0,0 +1,168 @@
+import io
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import BinaryIO, Dict, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadTooLarge(Exception):
+    """Le fichier dépasse la taille maximale autorisée"""
+
+
+class SpooledDownload:
+    """Fichier téléchargé par morceaux, en mémoire puis sur disque au-delà de ``spool_size``"""
+
+    def __init__(self, spool_size: int = 1024 * 1024, max_size: Optional[int] = None):
+        self.spool_size = spool_size
+        self.max_size = max_size
+        self.size = 0
+        self.path: Optional[str] = None
+        # Statut et en-têtes de la réponse (304 : contenu vide, inchangé)
+        self.status_code = 200
+        self.headers: Dict[str, str] = {}
+        self._file: BinaryIO = io.BytesIO()
+        self._sha256 = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> int:
+        self.size += len(chunk)
+        if self.max_size and self.size > self.max_size:
+            raise DownloadTooLarge(f"Fichier trop gros (> {self.max_size} octets)")
+        self._sha256.update(chunk)
+
+        if self.path is None and self.size > self.spool_size:
+            # Bascule sur disque
+            spooled = tempfile.NamedTemporaryFile(prefix="download-", delete=False)
+            spooled.write(self._file.getvalue())
+            self._file = spooled
+            self.path = spooled.name
+        return self._file.write(chunk)
+
+    def finish(self):
+        """Terminer l'écriture (le contenu devient lisible)"""
+        self._file.flush()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def source(self) -> Union[bytes, str]:
+        """Chemin du fichier sur disque, ou les octets s'il est resté en mémoire"""
+        return self.path if self.path else self._file.getvalue()
+
+    def read(self) -> bytes:
+        if self.path:
+            with open(self.path, 'rb') as f:
+                return f.read()
+        return self._file.getvalue()
+
+    def close(self):
+        self._file.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LoopSemaphore:
+    """``asyncio.Semaphore`` recréé quand la boucle d'événements change (``async with``)"""
+
+    def __init__(self, value: int):
+        self.value = value
+        self._semaphore = None
+        self._loop = None
+
+    def _get(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.value)
+            self._loop = loop
+        return self._semaphore
+
+    async def __aenter__(self):
+        await self._get().acquire()
+
+    async def __aexit__(self, *exc_info):
+        self._get().release()
+
+
+class HttpFetcher:
+    """Client HTTP partagé : session avec retries, appels dans un thread, concurrence bornée"""
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 30.0, retries: int = 3,
+                 spool_size: int = 1024 * 1024):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.spool_size = spool_size
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD'])
+        )
+        adapter = HTTPAdapter(
+            pool_connections=max_concurrency,
+            pool_maxsize=max_concurrency,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._limit = LoopSemaphore(max_concurrency)
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET non bloquant, limité par le sémaphore de concurrence"""
+        async with self._limit:
+            return await asyncio.to_thread(
+                self.session.get, url, headers=headers, timeout=self.timeout
+            )
+
+    def _download(self, url: str, headers: Optional[Dict[str, str]], max_size: Optional[int]) -> SpooledDownload:
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            length = response.headers.get('Content-Length')
+            if max_size and length and int(length) > max_size:
+                raise DownloadTooLarge(f"Fichier trop gros ({length} octets)")
+
+            download = SpooledDownload(self.spool_size, max_size)
+            download.status_code = response.status_code
+            download.headers = response.headers
+            if response.status_code == 304:
+                return download
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    download.write(chunk)
+                download.finish()
+            except BaseException:
+                download.close()
+                raise
+            return download
+
+    async def download(self, url: str, headers: Optional[Dict[str, str]] = None,
+                       max_size: Optional[int] = None) -> SpooledDownload:
+        """Télécharger en flux, avec une taille maximale (``DownloadTooLarge``).
+
+        Avec des en-têtes conditionnels (``If-None-Match``...), une réponse 304
+        donne un téléchargement vide de ``status_code`` 304.
+        """
+        async with self._limit:
+            return await asyncio.to_thread(self._download, url, headers, max_size)
@@ -0,0 +1,113 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services.document_store import Document, DocumentStore
+from services.pdf_extractor import PdfExtractor
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+
+
+class LocalFolderSync:
+    """Synchronisation incrémentale d'un dossier local"""
+
+    def __init__(self, folder: str, extractor: Optional[PdfExtractor] = None,
+                 extensions: Sequence[str] = SUPPORTED_EXTENSIONS):
+        self.folder = folder
+        self.extractor = extractor or PdfExtractor()
+        self.extensions = tuple(extensions)
+        self.index: Dict[str, Tuple[int, int, int]] = {}
+        self._lock = asyncio.Lock()
+
+    def _scan(self) -> Dict[str, Tuple[int, int, int]]:
+        """État actuel du dossier (thread)"""
+        state = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(self.extensions):
+                    stat = entry.stat()
+                    state[entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return state
+
+    async def load_document(self, filename: str) -> Document:
+        """Parser un fichier du dossier"""
+        file_path = os.path.join(self.folder, filename)
+        if filename.lower().endswith('.pdf'):
+            # Les workers ouvrent le fichier eux-mêmes
+            return Document.from_pages(await self.extractor.extract_pages(file_path))
+
+        def read():
+            with open(file_path, 'r', encoding='utf-8') as file:
+                return file.read()
+        return Document(await asyncio.to_thread(read))
+
+    async def sync(self, documents: DocumentStore) -> Dict[str, List[str]]:
+        """Appliquer le delta entre le dossier et ``documents``"""
+        async with self._lock:
+            return await self._sync(documents)
+
+    async def _sync(self, documents: DocumentStore) -> Dict[str, List[str]]:
+        state = await asyncio.to_thread(self._scan)
+        result = {'added': [], 'updated': [], 'deleted': [], 'unchanged': [], 'errors': []}
+
+        # Fichiers supprimés du dossier
+        for filename in list(self.index):
+            if filename not in state:
+                del self.index[filename]
+                documents.pop(filename, None)
+                result['deleted'].append(filename)
+                logger.info(f"Document supprimé : {filename}")
+
+        async def load(filename: str, signature: Tuple[int, int, int]):
+            updated = filename in self.index
+            try:
+                await documents.add(filename, await self.load_document(filename))
+                self.index[filename] = signature
+                result['updated' if updated else 'added'].append(filename)
+                logger.info(f"Document chargé : {filename}")
+            except Exception as e:
+                logger.error(f"Erreur avec {filename}: {e}")
+                result['errors'].append(filename)
+
+        changed = []
+        for filename, signature in state.items():
+            if self.index.get(filename) == signature and filename in documents:
+                result['unchanged'].append(filename)
+            else:
+                changed.append(load(filename, signature))
+        await asyncio.gather(*changed)
+        return result
+
+    async def watch(self, documents: DocumentStore, interval: float = 5.0,
+                    on_change: Optional[Callable[[Dict[str, List[str]]], Awaitable[None]]] = None):
+        """Surveiller le dossier et recharger en tâche de fond (ne se termine pas)"""
+        async def apply():
+            # Une erreur (sync ou on_change) ne doit pas arrêter la surveillance
+            try:
+                result = await self.sync(documents)
+                if result['added'] or result['updated'] or result['deleted']:
+                    logger.info(
+                        f"Dossier modifié : {len(result['added'])} ajoutés, "
+                        f"{len(result['updated'])} modifiés, {len(result['deleted'])} supprimés"
+                    )
+                    if on_change:
+                        await on_change(result)
+            except Exception as e:
+                logger.error(f"Erreur de surveillance du dossier : {e}")
+
+        await apply()
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            logger.info(f"watchfiles absent : polling de {self.folder} toutes les {interval}s")
+            while True:
+                await asyncio.sleep(interval)
+                await apply()
+
+        # Les événements sont regroupés : une rafale d'écritures = une synchro
+        logger.info(f"Surveillance de {self.folder} (watchfiles)")
+        async for _ in awatch(self.folder, recursive=False):
+            await apply()
@@ -0,0 +1,258 @@
+import io
+import os
+import re
+import asyncio
+import logging
+import unicodedata
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from services.text_cache import ExtractedTextCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Glyphes sans correspondance Unicode rendus par pdfplumber, ex. "(cid:42)"
+CID_PATTERN = re.compile(r'\(cid:\d+\)')
+# En dessous (caractères utiles par page sondée), le PDF est considéré comme scanné
+MIN_CHARS_PER_PAGE = 30
+
+
+def text_quality(pages: List[str]) -> float:
+    """Score d'un extracteur sur des pages sondées.
+
+    Caractères alphanumériques par page, pénalisés par la proportion de
+    caractères parasites (glyphes ``(cid:n)``, caractère de remplacement,
+    caractères de contrôle).
+    """
+    text = "".join(pages)
+    if not text.strip():
+        return 0.0
+
+    garbage = sum(len(match) for match in CID_PATTERN.findall(text))
+    text = CID_PATTERN.sub("", text)
+    useful = 0
+    for char in text:
+        if char.isalnum():
+            useful += 1
+        elif char == '\ufffd' or (unicodedata.category(char)[0] == 'C' and char not in '\n\t\r'):
+            garbage += 1
+
+    garbage_ratio = garbage / (len(text) + garbage or 1)
+    return useful / max(1, len(pages)) * (1 - garbage_ratio) ** 2
+
+
+def _open_source(source: Union[bytes, str]):
+    # Un chemin est lu directement par le worker : le PDF ne transite pas par l'IPC
+    return open(source, 'rb') if isinstance(source, str) else io.BytesIO(source)
+
+
+def _stop(total: int, end: Optional[int]) -> int:
+    return total if end is None else min(end, total)
+
+
+def _pypdf2_range(source: Union[bytes, str], start: int, end: Optional[int]) -> Tuple[List[str], int]:
+    import PyPDF2
+
+    with _open_source(source) as stream:
+        pdf_reader = PyPDF2.PdfReader(stream)
+        total = len(pdf_reader.pages)
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, _stop(total, end))], total
+
+
+def _pdfplumber_range(source: Union[bytes, str], start: int, end: Optional[int]) -> Tuple[List[str], int]:
+    import pdfplumber
+
+    with _open_source(source) as stream, pdfplumber.open(stream) as pdf:
+        total = len(pdf.pages)
+        return [pdf.pages[i].extract_text() or "" for i in range(start, _stop(total, end))], total
+
+
+def _pypdfium2_range(source: Union[bytes, str], start: int, end: Optional[int]) -> Tuple[List[str], int]:
+    import pypdfium2
+
+    # pdfium (C++) lit un chemin ou des octets, sans passer par un flux Python
+    pdf = pypdfium2.PdfDocument(source)
+    try:
+        total = len(pdf)
+        pages = []
+        for i in range(start, _stop(total, end)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range().replace('\r\n', '\n'))
+            textpage.close()
+            page.close()
+        return pages, total
+    finally:
+        pdf.close()
+
+
+def _pymupdf_range(source: Union[bytes, str], start: int, end: Optional[int]) -> Tuple[List[str], int]:
+    try:
+        import pymupdf
+    except ImportError:
+        # Anciennes versions : le module s'appelle ``fitz``
+        import fitz as pymupdf
+
+    if isinstance(source, str):
+        pdf = pymupdf.open(source)
+    else:
+        pdf = pymupdf.open(stream=source, filetype='pdf')
+    with pdf:
+        total = pdf.page_count
+        return [pdf[i].get_text() for i in range(start, _stop(total, end))], total
+
+
+# Extracteurs : ``(source, start, end) -> (pages [start, end), nombre total de pages)``
+BACKENDS: Dict[str, Callable[[Union[bytes, str], int, Optional[int]], Tuple[List[str], int]]] = {
+    'pypdf2': _pypdf2_range,
+    'pdfplumber': _pdfplumber_range,
+    'pypdfium2': _pypdfium2_range,
+    'pymupdf': _pymupdf_range,
+}
+# Paquet à importer pour chaque extracteur (les plus rapides sont optionnels)
+BACKEND_MODULES = {
+    'pypdf2': ('PyPDF2',),
+    'pdfplumber': ('pdfplumber',),
+    'pypdfium2': ('pypdfium2',),
+    'pymupdf': ('pymupdf', 'fitz'),
+}
+# Du plus rapide au plus lent : ``auto`` retient le premier installé
+PREFERRED_BACKENDS = ('pymupdf', 'pypdfium2', 'pypdf2', 'pdfplumber')
+
+
+def available_backends() -> List[str]:
+    """Extracteurs dont le paquet est installé"""
+    return [
+        name for name, modules in BACKEND_MODULES.items()
+        if any(importlib.util.find_spec(module) for module in modules)
+    ]
+
+
+def resolve_backend(backend: str) -> str:
+    """Vérifier qu'un extracteur est connu et installé (``auto`` : le plus
+    rapide des extracteurs installés) ; lève ``ValueError`` sinon"""
+    if backend != 'auto' and backend not in BACKENDS:
+        raise ValueError(f"Extracteur PDF inconnu : {backend} (auto, {', '.join(PREFERRED_BACKENDS)})")
+    installed = available_backends()
+    if backend == 'auto':
+        backend = next((name for name in PREFERRED_BACKENDS if name in installed), None)
+        if backend is None:
+            raise ValueError(f"Aucun extracteur PDF installé ({', '.join(PREFERRED_BACKENDS)})")
+    elif backend not in installed:
+        raise ValueError(
+            f"Extracteur PDF {backend} : paquet non installé (installés : {', '.join(installed) or 'aucun'})"
+        )
+    return backend
+
+
+def _extract_range(backend: str, source: Union[bytes, str], start: int,
+                   end: Optional[int]) -> Tuple[List[str], int]:
+    """Extraire les pages [start, end) d'un PDF (exécuté dans un processus worker).
+
+    ``source`` est le contenu du PDF ou le chemin d'un fichier. Retourne les
+    textes des pages et le nombre total de pages du document.
+    """
+    try:
+        extract = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Extracteur PDF inconnu : {backend}") from None
+    return extract(source, start, end)
+
+
+class PdfExtractor:
+    """Extraction de texte PDF sur un pool de processus"""
+
+    # À incrémenter quand le texte produit change (invalide le cache disque)
+    VERSION = 1
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 25,
+                 cache: Optional[ExtractedTextCache] = None, backend: str = 'auto'):
+        # Vérifié ici plutôt qu'au premier PDF : un PDF_BACKEND invalide arrête le bot au démarrage
+        self.backend = resolve_backend(backend)
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.cache = cache
+        self._executor = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, *args) -> Tuple[List[str], int]:
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.to_thread(_extract_range, *args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, _extract_range, *args)
+        except BrokenProcessPool:
+            # Un worker est mort (mémoire, PDF corrompu...) : on recrée le pool
+            logger.warning("Pool d'extraction PDF cassé, redémarrage")
+            self.shutdown()
+            return await asyncio.to_thread(_extract_range, *args)
+
+    async def extract_range(self, content: Union[bytes, str], backend: str, start: int,
+                            end: int) -> Tuple[List[str], int]:
+        """Extraire seulement les pages [start, end) (sans cache).
+
+        Retourne les pages et le nombre total de pages du document.
+        """
+        return await self._run(backend, content, start, end)
+
+    async def extract_pages(self, content: Union[bytes, str], backend: Optional[str] = None,
+                            sha256: Optional[str] = None) -> List[str]:
+        """Extraire le texte de chaque page, dans l'ordre.
+
+        ``content`` est le contenu du PDF ou le chemin d'un fichier ; ``sha256``
+        évite de rehasher un contenu dont le hash est déjà connu.
+        """
+        backend = backend or self.backend
+        if self.cache is None:
+            return await self._extract_pages(content, backend)
+
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(content_hash, content)
+        version = f"{backend}-v{self.VERSION}"
+        pages = await asyncio.to_thread(self.cache.get, sha256, version)
+        if pages is not None:
+            return pages
+
+        pages = await self._extract_pages(content, backend)
+        try:
+            await asyncio.to_thread(self.cache.put, sha256, version, pages)
+        except Exception as e:
+            logger.warning(f"Impossible d'écrire dans le cache de texte : {e}")
+        return pages
+
+    async def _extract_pages(self, content: Union[bytes, str], backend: str) -> List[str]:
+        step = self.pages_per_task
+        pages, total = await self._run(backend, content, 0, step)
+        if total <= step:
+            return pages
+
+        # Gros PDF : les plages restantes sont extraites en parallèle
+        chunks = await asyncio.gather(*(
+            self._run(backend, content, start, start + step)
+            for start in range(step, total, step)
+        ))
+        for chunk, _ in chunks:
+            pages.extend(chunk)
+        return pages
+
+    async def extract_text(self, content: Union[bytes, str], backend: Optional[str] = None,
+                           sha256: Optional[str] = None) -> str:
+        """Extraire le texte complet (un saut de ligne après chaque page)"""
+        pages = await self.extract_pages(content, backend, sha256)
+        return "".join(page + "\n" for page in pages)
+
+    def shutdown(self):
+        """Arrêter le pool de processus"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
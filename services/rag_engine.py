@@ -24,6 +24,8 @@ class RAGEngine:
             separators=["\n\n", "\n", ".", " ", ""]
         )
         self.vector_store = self._load_or_create_vector_store()
+        # Les embeddings sont calculés en parallèle, l'index est modifié un fichier à la fois
+        self._lock = asyncio.Lock()
     
     def _load_or_create_vector_store(self):
         """Charger ou créer la base vectorielle"""
@@ -50,8 +52,8 @@ class RAGEngine:
                 embedding_function=self.embeddings
             )
     
-    async def add_document(self, text: str, source: str, file_id: str):
-        """Ajouter un document à l'index"""
+    async def add_document(self, text: str, source: str, file_id: str, save: bool = True):
+        """Ajouter un document à l'index (``save=False`` : sauvegarde différée)"""
         try:
             # Découper le texte en chunks
             chunks = await asyncio.to_thread(
@@ -71,26 +73,59 @@ class RAGEngine:
                 for i, chunk in enumerate(chunks)
             ]
             
-            # Ajouter à la base vectorielle
-            if self.vector_store is None and self.config.VECTOR_DB_TYPE == "faiss":
-                self.vector_store = await asyncio.to_thread(
-                    FAISS.from_documents, documents, self.embeddings
-                )
+            if self.config.VECTOR_DB_TYPE == "faiss":
+                # Embeddings hors verrou : plusieurs fichiers en parallèle
+                embeddings = await asyncio.to_thread(self.embeddings.embed_documents, chunks)
+                text_embeddings = list(zip(chunks, embeddings))
+                metadatas = [doc.metadata for doc in documents]
+                
+                async with self._lock:
+                    if self.vector_store is None:
+                        self.vector_store = await asyncio.to_thread(
+                            FAISS.from_embeddings, text_embeddings, self.embeddings, metadatas=metadatas
+                        )
+                    else:
+                        await asyncio.to_thread(
+                            self.vector_store.add_embeddings, text_embeddings, metadatas=metadatas
+                        )
+                    if save:
+                        await self._save_faiss_index()
             else:
                 await asyncio.to_thread(
                     self.vector_store.add_documents, documents
                 )
             
-            # Sauvegarder si FAISS
-            if self.config.VECTOR_DB_TYPE == "faiss":
-                await self._save_faiss_index()
-            
             logger.info(f"Document {source} ajouté: {len(chunks)} chunks")
             
         except Exception as e:
             logger.error(f"Erreur lors de l'ajout du document {source}: {e}")
             raise
     
+    async def remove_document(self, file_id: str, save: bool = True):
+        """Retirer tous les chunks d'un fichier de l'index"""
+        if self.vector_store is None:
+            return
+        
+        try:
+            if self.config.VECTOR_DB_TYPE == "faiss":
+                async with self._lock:
+                    ids = [
+                        doc_id for doc_id, doc in self.vector_store.docstore._dict.items()
+                        if doc.metadata.get("file_id") == file_id
+                    ]
+                    if ids:
+                        await asyncio.to_thread(self.vector_store.delete, ids)
+                        if save:
+                            await self._save_faiss_index()
+                        logger.info(f"Fichier {file_id} retiré: {len(ids)} chunks")
+            elif self.config.VECTOR_DB_TYPE == "chroma":
+                await asyncio.to_thread(
+                    self.vector_store._collection.delete, where={"file_id": file_id}
+                )
+        except Exception as e:
+            logger.error(f"Erreur lors de la suppression du fichier {file_id}: {e}")
+            raise
+    
     async def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """Rechercher des documents pertinents"""
         if self.vector_store is None:
@@ -119,6 +154,11 @@ class RAGEngine:
             logger.error(f"Erreur lors de la recherche: {e}")
             return []
     
+    async def save(self):
+        """Sauvegarder l'index (après des ajouts avec ``save=False``)"""
+        async with self._lock:
+            await self._save_faiss_index()
+    
     async def _save_faiss_index(self):
         """Sauvegarder l'index FAISS"""
         if self.config.VECTOR_DB_TYPE == "faiss" and self.vector_store:
@@ -0,0 +1,192 @@
+import re
+import math
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from services.french_analyzer import TOKEN_PATTERN, light_stem, stem_forms
+from services.text_normalizer import NormalizedText
+
+_LINE_BREAK = re.compile(r'\n')
+
+# Paramètres BM25 usuels : saturation de la fréquence et normalisation par la longueur
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class TokenIndex:
+    """Index inversé positionnel d'un document : token normalisé -> occurrences"""
+
+    __slots__ = ('vocabulary', 'bounds', 'positions', 'starts', 'line_starts')
+
+    def __init__(self, vocabulary: Tuple[str, ...], bounds: array, positions: array,
+                 starts: array, line_starts: array):
+        self.vocabulary = vocabulary
+        self.bounds = bounds
+        self.positions = positions
+        self.starts = starts
+        self.line_starts = line_starts
+
+    @classmethod
+    def build(cls, original: str, normalized: NormalizedText) -> 'TokenIndex':
+        postings: Dict[str, List[int]] = {}
+        starts = array('I')
+        for position, match in enumerate(TOKEN_PATTERN.finditer(normalized.text)):
+            token = match[0]
+            starts.append(match.start())
+            occurrences = postings.get(token)
+            if occurrences is None:
+                postings[token] = [position]
+            else:
+                occurrences.append(position)
+
+        vocabulary = tuple(sorted(postings))
+        bounds = array('I', [0])
+        positions = array('I')
+        for token in vocabulary:
+            positions.extend(postings[token])
+            bounds.append(len(positions))
+
+        line_starts = array('I', [0])
+        line_starts.extend(match.end() for match in _LINE_BREAK.finditer(original))
+        return cls(vocabulary, bounds, positions, starts, line_starts)
+
+    def token_positions(self, token: str) -> Sequence[int]:
+        """Rangs (croissants) des occurrences d'un token exact"""
+        index = bisect_left(self.vocabulary, token)
+        if index == len(self.vocabulary) or self.vocabulary[index] != token:
+            return ()
+        return self.positions[self.bounds[index]:self.bounds[index + 1]]
+
+    def prefix_positions(self, prefix: str) -> Iterable[int]:
+        """Rangs (croissants) des tokens qui commencent par ``prefix``"""
+        first = bisect_left(self.vocabulary, prefix)
+        last = bisect_right(self.vocabulary, prefix + '\U0010ffff', lo=first)
+        if last - first == 1:
+            return self.positions[self.bounds[first]:self.bounds[last]]
+        return heapq.merge(*(
+            self.positions[self.bounds[index]:self.bounds[index + 1]] for index in range(first, last)
+        ))
+
+    def postings(self, token: str) -> List[int]:
+        """Offsets normalisés (croissants) d'un token exact"""
+        starts = self.starts
+        return [starts[position] for position in self.token_positions(token)]
+
+    @property
+    def length(self) -> int:
+        """Nombre de tokens du document"""
+        return len(self.positions)
+
+    def term_frequency(self, token: str) -> int:
+        index = bisect_left(self.vocabulary, token)
+        if index == len(self.vocabulary) or self.vocabulary[index] != token:
+            return 0
+        return self.bounds[index + 1] - self.bounds[index]
+
+    def line_at(self, offset: int) -> int:
+        """Numéro de ligne (à partir de 1) d'un offset original"""
+        return bisect_right(self.line_starts, offset)
+
+
+class CorpusStatistics:
+    """Statistiques BM25 du corpus, tenues à jour à l'ajout et au retrait des documents"""
+
+    def __init__(self, stemming: bool = True):
+        self.stemming = stemming
+        self.document_count = 0
+        self.total_length = 0
+        self.document_frequency: Dict[str, int] = {}
+
+    def term(self, token: str) -> str:
+        return light_stem(token) if self.stemming else token
+
+    def tokens(self, term: str) -> Tuple[str, ...]:
+        """Tokens à lire dans les index pour un terme (calculés, pas stockés)"""
+        return stem_forms(term) if self.stemming else (term,)
+
+    def add(self, index: TokenIndex):
+        self.document_count += 1
+        self.total_length += index.length
+        frequency = self.document_frequency
+        for term in {self.term(token) for token in index.vocabulary}:
+            frequency[term] = frequency.get(term, 0) + 1
+
+    def remove(self, index: TokenIndex):
+        self.document_count -= 1
+        self.total_length -= index.length
+        frequency = self.document_frequency
+        for term in {self.term(token) for token in index.vocabulary}:
+            count = frequency[term] - 1
+            if count:
+                frequency[term] = count
+            else:
+                del frequency[term]
+
+    def clear(self):
+        self.__init__(self.stemming)
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / self.document_count if self.document_count else 0.0
+
+    def idf(self, term: str) -> float:
+        """IDF BM25 (toujours positif) d'un terme (racine si ``stemming``)"""
+        frequency = self.document_frequency.get(term, 0)
+        return math.log(1 + (self.document_count - frequency + 0.5) / (frequency + 0.5))
+
+    def _terms(self, tokens: Sequence[str]) -> List[str]:
+        return list(dict.fromkeys(self.term(token) for token in tokens))
+
+    def score(self, index: TokenIndex, tokens: Sequence[str]) -> float:
+        """Score BM25 d'un document pour des termes déjà analysés"""
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * index.length / (self.average_length or 1))
+        total = 0.0
+        for term in self._terms(tokens):
+            frequency = sum(index.term_frequency(token) for token in self.tokens(term))
+            if frequency:
+                total += self.idf(term) * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return total
+
+    def best_windows(self, index: TokenIndex, tokens: Sequence[str], window: int,
+                     limit: int) -> List[Tuple[float, int]]:
+        """Meilleures fenêtres de ``window`` caractères (normalisés) d'un document.
+
+        Chaque fenêtre commence sur une occurrence d'un terme ; son score est
+        le BM25 des termes qu'elle contient. Retourne ``(score, offset)``
+        sans chevauchement, du meilleur au moins bon. Coût : les occurrences
+        des termes seulement.
+        """
+        terms = self._terms(tokens)
+        weights = {term: self.idf(term) for term in terms}
+        hits = list(heapq.merge(*(
+            ((offset, term) for offset in index.postings(token))
+            for term in terms for token in self.tokens(term)
+        )))
+        if not hits:
+            return []
+
+        scored = []
+        counts: Dict[str, int] = {}
+        end = 0
+        for start, (offset, _) in enumerate(hits):
+            # Fenêtre glissante [offset, offset + window) sur les occurrences triées
+            while end < len(hits) and hits[end][0] < offset + window:
+                term = hits[end][1]
+                counts[term] = counts.get(term, 0) + 1
+                end += 1
+            score = sum(
+                weights[term] * count * (BM25_K1 + 1) / (count + BM25_K1)
+                for term, count in counts.items() if count
+            )
+            scored.append((score, offset))
+            counts[hits[start][1]] -= 1
+
+        chosen: List[Tuple[float, int]] = []
+        for score, offset in sorted(scored, key=lambda item: (-item[0], item[1])):
+            if all(abs(offset - other) >= window for _, other in chosen):
+                chosen.append((score, offset))
+                if len(chosen) >= limit:
+                    break
+        return chosen
@@ -0,0 +1,323 @@
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from services.french_analyzer import TOKEN_PATTERN
+from services.search_index import TokenIndex
+from services.text_normalizer import normalize
+
+# Guillemets, parenthèses, ou un mot (jusqu'au prochain espace, guillemet ou parenthèse)
+_LEXEME = re.compile(r'"([^"]*)"?|([()])|([^\s()"]+)')
+_NEAR = re.compile(r'NEAR/(\d+)$')
+DEFAULT_NEAR = 10
+
+# Une occurrence : rangs ``[premier token, dernier token + 1)``
+Span = Tuple[int, int]
+# Lecture ``passage(début, fin)`` du texte normalisé d'un document
+Passage = Callable[[int, int], str]
+
+
+class QueryError(ValueError):
+    """Requête de recherche mal formée (message à montrer à l'utilisateur)"""
+
+
+class Phrase(NamedTuple):
+    """Tokens consécutifs ; ``prefix`` : le dernier peut être un début de mot"""
+    tokens: Tuple[str, ...]
+    prefix: bool
+
+
+class And(NamedTuple):
+    left: 'Query'
+    right: 'Query'
+
+
+class Or(NamedTuple):
+    left: 'Query'
+    right: 'Query'
+
+
+class Not(NamedTuple):
+    operand: 'Query'
+
+
+class Near(NamedTuple):
+    """Deux termes séparés d'au plus ``distance`` mots"""
+    left: 'Query'
+    right: 'Query'
+    distance: int
+
+
+Query = Union[Phrase, And, Or, Not, Near]
+
+
+def _lex(text: str) -> List[list]:
+    """Découper une requête ; les mots nus qui se suivent forment une phrase"""
+    lexemes = []
+    for quoted, paren, word in _LEXEME.findall(text):
+        if paren:
+            lexemes.append([paren])
+        elif word in ('AND', 'OR', 'NOT'):
+            lexemes.append([word])
+        elif word == 'NEAR' or _NEAR.match(word):
+            match = _NEAR.match(word)
+            lexemes.append(['NEAR', int(match[1]) if match else DEFAULT_NEAR])
+        elif word.startswith('-') and len(word) > 1:
+            # ``-mot`` : exclusion d'un seul mot, qui ne s'allonge pas
+            lexemes.append(['NOT'])
+            lexemes.append(['PHRASE', TOKEN_PATTERN.findall(normalize(word[1:])), False, False])
+        elif word:
+            tokens = TOKEN_PATTERN.findall(normalize(word))
+            if not tokens:
+                continue
+            if lexemes and lexemes[-1][0] == 'PHRASE' and lexemes[-1][3]:
+                lexemes[-1][1].extend(tokens)
+            else:
+                lexemes.append(['PHRASE', tokens, True, True])
+        else:
+            # Entre guillemets : mots exacts, jamais fusionnés avec leurs voisins
+            lexemes.append(['PHRASE', TOKEN_PATTERN.findall(normalize(quoted)), False, False])
+    return lexemes
+
+
+class _Parser:
+    """Descente récursive : OR < AND (implicite entre deux termes) < NEAR < NOT"""
+
+    def __init__(self, lexemes: List[list]):
+        self.lexemes = lexemes
+        self.index = 0
+
+    def peek(self) -> Optional[str]:
+        return self.lexemes[self.index][0] if self.index < len(self.lexemes) else None
+
+    def take(self) -> list:
+        lexeme = self.lexemes[self.index]
+        self.index += 1
+        return lexeme
+
+    def parse_or(self) -> Query:
+        query = self.parse_and()
+        while self.peek() == 'OR':
+            self.take()
+            query = Or(query, self.parse_and())
+        return query
+
+    def parse_and(self) -> Query:
+        query = self.parse_near()
+        while self.peek() in ('AND', 'NOT', 'PHRASE', '('):
+            if self.peek() == 'AND':
+                self.take()
+            query = And(query, self.parse_near())
+        return query
+
+    def parse_near(self) -> Query:
+        query = self.parse_unary()
+        while self.peek() == 'NEAR':
+            distance = self.take()[1]
+            query = Near(query, self.parse_unary(), distance)
+        return query
+
+    def parse_unary(self) -> Query:
+        kind = self.peek()
+        if kind == 'NOT':
+            self.take()
+            return Not(self.parse_unary())
+        if kind == '(':
+            self.take()
+            query = self.parse_or()
+            if self.peek() != ')':
+                raise QueryError("parenthèse non fermée")
+            self.take()
+            return query
+        if kind == 'PHRASE':
+            _, tokens, prefix, _ = self.take()
+            if not tokens:
+                raise QueryError("terme vide (rien à chercher entre guillemets ?)")
+            return Phrase(tuple(tokens), prefix)
+        if kind is None:
+            raise QueryError("terme manquant en fin de requête")
+        raise QueryError(f"{kind} inattendu")
+
+
+def _check(query: Query, negation_allowed: bool = False):
+    # NOT n'a de sens qu'à côté d'un terme positif : "a NOT b", "a -b"
+    if isinstance(query, Not):
+        if not negation_allowed:
+            raise QueryError("NOT doit suivre un terme à chercher (ex. : a NOT b)")
+        _check(query.operand)
+    elif isinstance(query, And):
+        if isinstance(query.left, Not) and isinstance(query.right, Not):
+            raise QueryError("NOT doit suivre un terme à chercher (ex. : a NOT b)")
+        _check(query.left, True)
+        _check(query.right, True)
+    elif isinstance(query, (Or, Near)):
+        _check(query.left)
+        _check(query.right)
+
+
+@lru_cache(maxsize=256)
+def parse_query(text: str) -> Query:
+    """Analyser une requête de recherche.
+
+    - mots nus consécutifs : une phrase ; seuls, le dernier mot peut être un
+      début de mot (``délai de dégag``)
+    - ``"..."`` : une phrase aux mots exacts
+    - ``a b`` ou ``a AND b`` : les deux ; ``a OR b`` : l'un ou l'autre ;
+      ``a NOT b`` ou ``a -b`` : a sans b ; ``a NEAR/5 b`` : à 5 mots au plus
+    - parenthèses pour grouper
+
+    Lève ``QueryError`` si la requête est mal formée. Le résultat est mis en
+    cache (requêtes répétées).
+    """
+    lexemes = _lex(text)
+    if not lexemes:
+        raise QueryError("requête vide")
+    parser = _Parser(lexemes)
+    query = parser.parse_or()
+    if parser.index < len(lexemes):
+        raise QueryError(f"{parser.peek()} inattendu")
+    _check(query)
+    if isinstance(query, Phrase):
+        return query
+    # Avec des opérateurs, mots entiers : un début de mot ferait exploser les listes
+    return _exact(query)
+
+
+def _exact(query: Query) -> Query:
+    if isinstance(query, Phrase):
+        return query._replace(prefix=False)
+    if isinstance(query, Not):
+        return Not(_exact(query.operand))
+    return query._replace(left=_exact(query.left), right=_exact(query.right))
+
+
+def _gallop(values: Sequence[int], target: int, low: int) -> int:
+    """Premier indice ``>= low`` tel que ``values[i] >= target``.
+
+    Recherche exponentielle depuis ``low`` puis dichotomie : avancer d'un
+    curseur à l'autre coûte O(log distance), pas O(log n) ni O(distance).
+    """
+    size = len(values)
+    if low >= size or values[low] >= target:
+        return low
+    step = 1
+    while low + step < size and values[low + step] < target:
+        low += step
+        step *= 2
+    return bisect_left(values, target, low + 1, min(size, low + step + 1))
+
+
+def _phrase(phrase: Phrase, index: TokenIndex, passage: Passage, limit: Optional[int]) -> List[Span]:
+    tokens = phrase.tokens
+    exact = tokens[:-1] if phrase.prefix else tokens
+    if not exact:
+        # Fusion paresseuse : seules les ``limit`` premières occurrences sont lues
+        positions = islice(index.prefix_positions(tokens[-1]), limit)
+        return [(position, position + 1) for position in positions]
+
+    lists = [index.token_positions(token) for token in exact]
+    if len(tokens) == 1:
+        return [(position, position + 1) for position in islice(lists[0], limit)]
+    # La liste la plus courte sert d'ancre, les autres sont parcourues au galop
+    anchor = min(range(len(lists)), key=lambda i: len(lists[i]))
+    cursors = [0] * len(lists)
+    starts = index.starts
+    last = len(tokens) - 1
+    spans = []
+    for position in lists[anchor]:
+        first = position - anchor
+        if first < 0:
+            continue
+        for i, positions in enumerate(lists):
+            if i == anchor:
+                continue
+            cursor = cursors[i] = _gallop(positions, first + i, cursors[i])
+            if cursor == len(positions) or positions[cursor] != first + i:
+                break
+        else:
+            if phrase.prefix:
+                # Le dernier mot, début de mot, est vérifié sur le texte normalisé
+                if first + last >= len(starts):
+                    continue
+                start = starts[first + last]
+                if passage(start, start + len(tokens[-1])) != tokens[-1]:
+                    continue
+            spans.append((first, first + len(tokens)))
+            if len(spans) == limit:
+                break
+    return spans
+
+
+def _merge(left: List[Span], right: List[Span]) -> List[Span]:
+    """Union triée de deux listes d'occurrences triées"""
+    return sorted(set(left).union(right))
+
+
+def _near(left: List[Span], right: List[Span], distance: int) -> List[Span]:
+    if not left or not right:
+        return []
+    # Symétrique : on parcourt la liste courte, on galope dans la longue
+    if len(left) > len(right):
+        left, right = right, left
+    right_starts = [start for start, _ in right]
+    longest = max(end - start for start, end in right)
+    spans = set()
+    cursor = 0
+    for start, end in left:
+        # Occurrences de droite qui peuvent tomber à ``distance`` mots de celle-ci
+        cursor = _gallop(right_starts, start - distance - longest, cursor)
+        i = cursor
+        while i < len(right) and right[i][0] <= end + distance:
+            other_start, other_end = right[i]
+            if other_end + distance >= start:
+                spans.add((min(start, other_start), max(end, other_end)))
+            i += 1
+    return sorted(spans)
+
+
+def evaluate(query: Query, index: TokenIndex, passage: Passage, limit: Optional[int] = None) -> List[Span]:
+    """Occurrences (rangs de tokens, triées) d'une requête dans un document ;
+    vide si le document ne correspond pas. ``passage`` lit le texte normalisé.
+
+    Avec ``limit``, seules les ``limit`` premières occurrences sont
+    cherchées : les premières d'une union sont parmi les premières de
+    chaque opérande, et une exclusion n'a besoin que d'une occurrence.
+    """
+    if isinstance(query, Phrase):
+        return _phrase(query, index, passage, limit)
+    if isinstance(query, Or):
+        spans = _merge(evaluate(query.left, index, passage, limit), evaluate(query.right, index, passage, limit))
+        return spans[:limit]
+    if isinstance(query, Near):
+        # La proximité a besoin de toutes les occurrences des deux côtés
+        left = evaluate(query.left, index, passage)
+        spans = _near(left, evaluate(query.right, index, passage), query.distance) if left else []
+        return spans[:limit]
+    if isinstance(query, And):
+        positive, negative = query.left, query.right
+        if isinstance(positive, Not):
+            positive, negative = negative, positive
+        spans = evaluate(positive, index, passage, limit)
+        if not spans:
+            return []
+        if isinstance(negative, Not):
+            return [] if evaluate(negative.operand, index, passage, 1) else spans
+        other = evaluate(negative, index, passage, limit)
+        return _merge(spans, other)[:limit] if other else []
+    raise QueryError("NOT doit suivre un terme à chercher (ex. : a NOT b)")
+
+
+def span_offsets(span: Span, index: TokenIndex, passage: Passage) -> Tuple[int, int]:
+    """Offsets normalisés ``[début, fin)`` d'une occurrence"""
+    start, end = span
+    last = index.starts[end - 1]
+    # Fin du dernier token : lue par morceaux, sans relire tout le texte
+    size = 64
+    while True:
+        chunk = passage(last, last + size)
+        length = TOKEN_PATTERN.match(chunk).end()
+        if length < len(chunk) or len(chunk) < size:
+            return index.starts[start], last + length
+        size *= 4
@@ -0,0 +1,133 @@
+import os
+import time
+import pickle
+import struct
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from services.document_store import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TGBOTSNAP"
+SNAPSHOT_VERSION = 5
+_HEADER = struct.Struct("<I")
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+class SnapshotError(Exception):
+    """Snapshot absent de la bonne version, tronqué ou corrompu"""
+
+
+class _HashingWriter:
+    """Fichier en écriture qui calcule le SHA-256 au passage"""
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        return self.file.write(data)
+
+
+def save_snapshot(path: str, documents: DocumentStore, state: Dict[str, Any]):
+    """Écrire l'état complet (documents, pages, textes normalisés, index, tables
+    des suffixes éventuelles et ``state``).
+
+    Les documents sont écrits un par un (jamais tout le corpus en mémoire) dans
+    un fichier temporaire, suivi du SHA-256 de son contenu, puis renommé :
+    un crash pendant l'écriture laisse l'ancien snapshot intact.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            writer = _HashingWriter(f)
+            writer.write(MAGIC + _HEADER.pack(SNAPSHOT_VERSION))
+            # Un pickle par document : rien ne garde les documents déjà écrits en vie
+            header = {'created_at': time.time(), 'substring_index': documents.substring_index, 'state': state}
+            pickle.dump(header, writer, pickle.HIGHEST_PROTOCOL)
+            for entry in documents.entries():
+                pickle.dump(entry, writer, pickle.HIGHEST_PROTOCOL)
+                count += 1
+            pickle.dump(None, writer, pickle.HIGHEST_PROTOCOL)
+            f.write(writer.sha256.digest())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    logger.info(f"Snapshot écrit : {count} documents ({os.path.getsize(path)} octets)")
+
+
+def _verify(path: str) -> int:
+    """Contrôler l'en-tête et la somme SHA-256, retourner la taille utile"""
+    size = os.path.getsize(path)
+    header_size = len(MAGIC) + _HEADER.size
+    if size < header_size + _DIGEST_SIZE:
+        raise SnapshotError("snapshot tronqué")
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        header = f.read(header_size)
+        if header[:len(MAGIC)] != MAGIC:
+            raise SnapshotError("pas un snapshot")
+        version, = _HEADER.unpack(header[len(MAGIC):])
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"version {version} (attendue : {SNAPSHOT_VERSION})")
+        sha256.update(header)
+        remaining = size - header_size - _DIGEST_SIZE
+        while remaining:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                raise SnapshotError("snapshot tronqué")
+            sha256.update(chunk)
+            remaining -= len(chunk)
+        if f.read(_DIGEST_SIZE) != sha256.digest():
+            raise SnapshotError("somme de contrôle invalide")
+    return size - _DIGEST_SIZE
+
+
+def load_snapshot(path: str, documents: DocumentStore) -> Optional[Dict[str, Any]]:
+    """Recharger un snapshot dans ``documents`` et retourner son ``state``.
+
+    Retourne None (et ne touche pas à ``documents``) si le fichier est absent,
+    invalide ou écrit avec un autre réglage ``substring_index`` (les tables des
+    suffixes manquantes seraient reconstruites une à une au démarrage) :
+    l'appelant repart d'une synchronisation complète.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        _verify(path)
+    except (OSError, SnapshotError) as e:
+        logger.warning(f"Snapshot ignoré ({path}) : {e}")
+        return None
+
+    count = 0
+    try:
+        with open(path, 'rb') as f:
+            f.seek(len(MAGIC) + _HEADER.size)
+            header = pickle.load(f)
+            if header['substring_index'] != documents.substring_index:
+                logger.warning(f"Snapshot ignoré ({path}) : écrit avec substring_index={header['substring_index']}")
+                return None
+            while True:
+                entry = pickle.load(f)
+                if entry is None:
+                    break
+                documents.restore(*entry)
+                count += 1
+    except Exception as e:
+        # Format devenu incompatible (classes modifiées) : pas d'état à moitié chargé
+        logger.warning(f"Snapshot illisible ({path}) : {e}")
+        documents.clear()
+        return None
+    age = time.time() - header['created_at']
+    logger.info(f"Snapshot chargé : {count} documents (écrit il y a {age:.0f}s)")
+    return header['state']
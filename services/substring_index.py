@@ -0,0 +1,132 @@
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+# Largeur (en caractères) du premier tri des suffixes, par paquets
+_FIRST_WIDTH = 4
+
+# ``passage(début, fin)`` : tranche du texte normalisé, lue à la demande
+Passage = Callable[[int, int], str]
+
+
+class SuffixArray:
+    """Table des suffixes d'un texte normalisé : sous-chaînes quelconques"""
+
+    __slots__ = ('suffixes',)
+
+    def __init__(self, suffixes: array):
+        self.suffixes = suffixes
+
+    @classmethod
+    def build(cls, text: str) -> 'SuffixArray':
+        """Trier les suffixes par doublement de préfixe (Manber-Myers).
+
+        Les suffixes sont d'abord rangés par paquets de ``_FIRST_WIDTH``
+        caractères ; ensuite, seuls les groupes ex aequo sont retriés, sur le
+        rang du suffixe ``width`` caractères plus loin, ``width`` doublant à
+        chaque tour. Rangs et table sont des ``array`` : aucune sous-chaîne
+        n'est créée par suffixe.
+        """
+        size = len(text)
+        buckets = {}
+        for position in range(size):
+            key = text[position:position + _FIRST_WIDTH]
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = array('I', (position,))
+            else:
+                bucket.append(position)
+
+        # ``rank`` : 1 + début du groupe du suffixe dans la table ; 0 après la fin du texte
+        suffixes = array('I')
+        rank = array('I', bytes(4 * size))
+        groups = []
+        for key in sorted(buckets):
+            bucket = buckets.pop(key)
+            start = len(suffixes)
+            suffixes.extend(bucket)
+            if len(bucket) > 1:
+                groups.append((start, len(suffixes)))
+            for position in bucket:
+                rank[position] = start + 1
+
+        width = _FIRST_WIDTH
+        while groups:
+            if len(rank) < size + width:
+                rank.extend(bytes(4 * (size + width - len(rank))))
+            rank_of = rank.__getitem__
+            pending = []
+            for start, end in groups:
+                # Les rangs déjà affinés pendant ce tour restent corrects (Larsson-Sadakane)
+                shifted = sorted([position + width for position in suffixes[start:end]], key=rank_of)
+                keys = list(map(rank_of, shifted))
+                suffixes[start:end] = array('I', [position - width for position in shifted])
+                first = 0
+                for i in range(1, end - start + 1):
+                    if i < end - start and keys[i] == keys[first]:
+                        continue
+                    if i - first > 1:
+                        pending.append((start + first, start + i))
+                    for position in shifted[first:i]:
+                        rank[position - width] = start + first + 1
+                    first = i
+            groups = pending
+            width *= 2
+        return cls(suffixes)
+
+    def _range(self, passage: Passage, query: str) -> Tuple[int, int]:
+        """Intervalle ``[début, fin)`` de la table des suffixes qui commencent par ``query``"""
+        suffixes = self.suffixes
+        size = len(query)
+        low, high = 0, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            start = suffixes[middle]
+            if passage(start, start + size) < query:
+                low = middle + 1
+            else:
+                high = middle
+        first, high = low, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            start = suffixes[middle]
+            if passage(start, start + size) == query:
+                low = middle + 1
+            else:
+                high = middle
+        return first, low
+
+    @staticmethod
+    def _can_overlap(query: str) -> bool:
+        # Deux occurrences ne se chevauchent que si la requête a un bord ("aba", "aa")
+        return any(query[:size] == query[-size:] for size in range(1, len(query)))
+
+    def locate(self, passage: Passage, query: str, limit: Optional[int] = None) -> List[int]:
+        """Débuts (croissants) des occurrences sans chevauchement de ``query``"""
+        if not query:
+            return []
+        first, last = self._range(passage, query)
+        positions = sorted(self.suffixes[first:last])
+        if self._can_overlap(query):
+            kept = []
+            end = 0
+            for position in positions:
+                if position >= end:
+                    kept.append(position)
+                    end = position + len(query)
+            positions = kept
+        return positions[:limit] if limit is not None else positions
+
+    def count(self, passage: Passage, query: str) -> int:
+        """Nombre d'occurrences, comme ``text.count(query)``"""
+        if not query:
+            return 0
+        if self._can_overlap(query):
+            return len(self.locate(passage, query))
+        first, last = self._range(passage, query)
+        return last - first
+
+    def contains(self, passage: Passage, query: str) -> bool:
+        if not query:
+            return False
+        first, last = self._range(passage, query)
+        return last > first
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(source: Union[bytes, str]) -> str:
+    """SHA-256 des octets bruts d'un fichier (octets ou chemin)"""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+
+    sha256 = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class ExtractedTextCache:
+    """Cache disque du texte extrait, indexé par le hash du contenu"""
+
+    def __init__(self, path: str = "text_cache"):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self.db_path = os.path.join(self.path, "manifest.sqlite")
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " sha256 TEXT NOT NULL,"
+                " extractor TEXT NOT NULL,"
+                " blob TEXT NOT NULL,"
+                " page_offsets TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (sha256, extractor))"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS choices ("
+                " sha256 TEXT NOT NULL,"
+                " selector TEXT NOT NULL,"
+                " choice TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (sha256, selector))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Une connexion par appel : le cache est utilisé depuis plusieurs threads
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, sha256: str, extractor: str) -> Optional[List[str]]:
+        """Retourner les pages en cache, ou None"""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT blob, page_offsets FROM entries WHERE sha256 = ? AND extractor = ?",
+                (sha256, extractor)
+            ).fetchone()
+        if row is None:
+            return None
+
+        blob, offsets = row
+        try:
+            with open(os.path.join(self.path, blob), 'rb') as f:
+                text = zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error) as e:
+            logger.warning(f"Entrée de cache illisible {blob}: {e}")
+            return None
+
+        offsets = json.loads(offsets)
+        bounds = offsets[1:] + [len(text)]
+        return [text[start:end] for start, end in zip(offsets, bounds)]
+
+    def put(self, sha256: str, extractor: str, pages: List[str]):
+        """Enregistrer les pages extraites d'un fichier"""
+        offsets = []
+        position = 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page)
+        data = zlib.compress("".join(pages).encode('utf-8'))
+
+        # Écriture atomique du blob avant de le référencer dans le manifeste
+        blob = f"{sha256}-{extractor}.zlib"
+        blob_path = os.path.join(self.path, blob)
+        # Nom temporaire unique : deux threads peuvent écrire le même contenu en même temps
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{blob}.", suffix=".tmp", dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (sha256, extractor, blob, json.dumps(offsets), len(data), time.time())
+            )
+
+    def get_choice(self, sha256: str, selector: str) -> Optional[str]:
+        """Décision mémorisée pour un fichier (ex. : extracteur retenu), ou None"""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT choice FROM choices WHERE sha256 = ? AND selector = ?",
+                (sha256, selector)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_choice(self, sha256: str, selector: str, choice: str):
+        """Mémoriser une décision pour un fichier"""
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO choices VALUES (?, ?, ?, ?)",
+                (sha256, selector, choice, time.time())
+            )
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from typing import Callable, Iterator, Optional, Tuple
+
+# Un point de reprise normalisé -> original tous les NORMALIZE_BLOCK caractères
+NORMALIZE_BLOCK = 256
+
+_SPACES = re.compile(r' {2,}')
+# Ligatures que la décomposition Unicode ne sépare pas
+_SPECIAL = {'œ': 'oe', 'æ': 'ae', '’': "'", 'ʼ': "'", '‘': "'"}
+
+
+class _FoldTable(dict):
+    """Table ``str.translate`` : minuscules, sans accents, espaces unifiés"""
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        if char.isspace():
+            folded = ' '
+        else:
+            folded = _SPECIAL.get(char.lower())
+            if folded is None:
+                decomposed = unicodedata.normalize('NFKD', char.casefold())
+                folded = ''.join(c for c in decomposed if not unicodedata.combining(c))
+                folded = ''.join(_SPECIAL.get(c, c) for c in folded)
+        self[code] = folded
+        return folded
+
+
+FOLD = _FoldTable()
+
+
+def normalize(text: str) -> str:
+    """Forme normalisée d'un texte court (requête, nom de document)"""
+    return _SPACES.sub(' ', text.translate(FOLD)).strip()
+
+
+def _ends_with_space(original: str) -> bool:
+    # Les marques combinantes isolées disparaissent à la normalisation
+    for char in reversed(original):
+        folded = char.translate(FOLD)
+        if folded:
+            return folded.endswith(' ')
+    return True
+
+
+class NormalizedText:
+    """Texte normalisé d'un document et correspondance vers l'original"""
+
+    __slots__ = ('text', 'original_marks', 'normalized_marks')
+
+    def __init__(self, text: str, original_marks: array, normalized_marks: array):
+        self.text = text
+        self.original_marks = original_marks
+        self.normalized_marks = normalized_marks
+
+    @classmethod
+    def build(cls, original: str) -> 'NormalizedText':
+        parts = []
+        original_marks = array('I')
+        normalized_marks = array('I')
+        position = 0
+        previous_space = True
+        for start in range(0, len(original), NORMALIZE_BLOCK):
+            block = _SPACES.sub(' ', str.__getitem__(original, slice(start, start + NORMALIZE_BLOCK)).translate(FOLD))
+            if previous_space and block.startswith(' '):
+                block = block[1:]
+            original_marks.append(start)
+            normalized_marks.append(position)
+            parts.append(block)
+            position += len(block)
+            if block:
+                previous_space = block.endswith(' ')
+        return cls("".join(parts), original_marks, normalized_marks)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def to_original(self, offset: int, passage: Callable[[int, int], str]) -> int:
+        """Offset dans l'original du caractère normalisé ``offset``.
+
+        ``passage(start, end)`` lit l'original (seul un bloc est lu).
+        """
+        if not self.original_marks:
+            return 0
+        index = bisect_right(self.normalized_marks, offset) - 1
+        start = self.original_marks[index]
+        remaining = offset - self.normalized_marks[index]
+        # Le texte normalisé n'est pas relu : l'espace éventuel qui précède le
+        # bloc se déduit des derniers caractères originaux avant ``start``
+        previous_space = self.normalized_marks[index] == 0 or _ends_with_space(passage(max(0, start - 16), start))
+
+        block = passage(start, start + NORMALIZE_BLOCK)
+        for position, char in enumerate(block):
+            for folded in char.translate(FOLD):
+                if folded == ' ':
+                    if previous_space:
+                        continue
+                    previous_space = True
+                else:
+                    previous_space = False
+                if not remaining:
+                    return start + position
+                remaining -= 1
+        return start + len(block)
+
+    def finditer(self, query: str, start: int = 0) -> Iterator[Tuple[int, int]]:
+        """Occurrences ``[début, fin)`` d'une requête déjà normalisée"""
+        if not query:
+            return
+        position = self.text.find(query, start)
+        while position != -1:
+            yield position, position + len(query)
+            position = self.text.find(query, position + len(query))
+
+    def find(self, query: str, start: int = 0) -> Optional[Tuple[int, int]]:
+        return next(self.finditer(query, start), None)
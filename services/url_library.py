@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import posixpath
+from urllib.parse import unquote, urlsplit
+from typing import Any, Dict, List, Optional
+
+from services.document_store import Document, DocumentStore
+from services.http_fetcher import DownloadTooLarge, HttpFetcher, SpooledDownload
+from services.pdf_extractor import PdfExtractor
+
+logger = logging.getLogger(__name__)
+
+
+class UrlLibrary:
+    """Documents ajoutés depuis des URLs, avec cache HTTP et dédoublonnage"""
+
+    def __init__(self, documents: DocumentStore, fetcher: Optional[HttpFetcher] = None,
+                 extractor: Optional[PdfExtractor] = None, max_file_size: Optional[int] = None):
+        self.documents = documents
+        self.fetcher = fetcher or HttpFetcher()
+        self.extractor = extractor or PdfExtractor()
+        self.max_file_size = max_file_size
+        # {url: {'name', 'sha256', 'etag', 'last_modified'}}
+        self.urls: Dict[str, Dict[str, Optional[str]]] = {}
+        # {sha256: nom du document}
+        self.by_hash: Dict[str, str] = {}
+        self._parsing: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def document_name(url: str) -> str:
+        """Nom de document tiré du chemin de l'URL"""
+        path = urlsplit(url).path
+        return unquote(posixpath.basename(path.rstrip('/'))) or urlsplit(url).netloc
+
+    def _free_name(self, name: str) -> str:
+        # Même nom de fichier, contenu différent : "cours.pdf (2)"
+        candidate, index = name, 2
+        while candidate in self.documents:
+            candidate = f"{name} ({index})"
+            index += 1
+        return candidate
+
+    async def _parse(self, url: str, download: SpooledDownload) -> Document:
+        content_type = download.headers.get('Content-Type', '')
+        if url.lower().split('?')[0].endswith('.pdf') or 'application/pdf' in content_type:
+            pages = await self.extractor.extract_pages(download.source(), sha256=download.sha256)
+            return Document.from_pages(pages, {'url': url})
+        text = await asyncio.to_thread(download.read)
+        return Document(text.decode('utf-8', errors='replace'), metadata={'url': url})
+
+    async def _store(self, url: str, entry: Optional[Dict[str, Any]], download: SpooledDownload) -> str:
+        """Parser un nouveau contenu et l'enregistrer dans ``documents``"""
+        document = await self._parse(url, download)
+        old_sha256 = entry['sha256'] if entry else None
+        shared = any(
+            other_url != url and other['sha256'] == old_sha256
+            for other_url, other in self.urls.items()
+        )
+        if entry and not shared and self.by_hash.get(old_sha256) == entry['name']:
+            # Nouvelle version de la même URL : elle garde son nom
+            name = entry['name']
+            del self.by_hash[old_sha256]
+        else:
+            name = self._free_name(self.document_name(url))
+        await self.documents.add(name, document)
+        self.by_hash[download.sha256] = name
+        return name
+
+    def _release(self, sha256: str):
+        """Retirer un contenu qui n'est plus référencé par aucune URL"""
+        if any(entry['sha256'] == sha256 for entry in self.urls.values()):
+            return
+        name = self.by_hash.pop(sha256, None)
+        if name:
+            self.documents.pop(name, None)
+
+    def clear(self):
+        """Oublier toutes les URLs et leurs documents"""
+        for name in self.by_hash.values():
+            self.documents.pop(name, None)
+        self.urls.clear()
+        self.by_hash.clear()
+
+    async def add(self, url: str) -> Dict[str, Any]:
+        """Ajouter (ou rafraîchir) une URL.
+
+        ``status`` vaut ``added``, ``updated``, ``unchanged`` (304 ou même
+        contenu) ou ``duplicate`` (contenu déjà présent sous un autre nom).
+        """
+        entry = self.urls.get(url)
+        headers = {}
+        if entry and entry['name'] in self.documents:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        download = await self.fetcher.download(url, headers=headers, max_size=self.max_file_size)
+        with download:
+            if download.status_code == 304:
+                return {'url': url, 'name': entry['name'], 'status': 'unchanged'}
+
+            sha256 = download.sha256
+            validators = {
+                'etag': download.headers.get('ETag'),
+                'last_modified': download.headers.get('Last-Modified')
+            }
+            if entry and entry['sha256'] == sha256 and entry['name'] in self.documents:
+                entry.update(validators)
+                return {'url': url, 'name': entry['name'], 'status': 'unchanged'}
+
+            name = self.by_hash.get(sha256)
+            if name in self.documents:
+                status = 'duplicate'
+            elif sha256 in self._parsing:
+                # Deux miroirs téléchargés en même temps : un seul parsing
+                name = await self._parsing[sha256]
+                status = 'duplicate'
+            else:
+                task = asyncio.ensure_future(self._store(url, entry, download))
+                self._parsing[sha256] = task
+                try:
+                    name = await task
+                finally:
+                    del self._parsing[sha256]
+                status = 'updated' if entry else 'added'
+
+        previous = entry['sha256'] if entry else None
+        self.urls[url] = {'name': name, 'sha256': sha256, **validators}
+        if previous and previous != sha256:
+            self._release(previous)
+        logger.info(f"URL {url} : {status} ({name})")
+        return {'url': url, 'name': name, 'status': status}
+
+    async def add_many(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """Ajouter plusieurs URLs en parallèle (erreurs rapportées par URL)"""
+        async def add(url: str) -> Dict[str, Any]:
+            try:
+                return await self.add(url)
+            except DownloadTooLarge as e:
+                return {'url': url, 'name': None, 'status': 'too_large', 'error': str(e)}
+            except Exception as e:
+                logger.error(f"Erreur avec {url}: {e}")
+                return {'url': url, 'name': None, 'status': 'error', 'error': str(e)}
+
+        return await asyncio.gather(*(add(url) for url in dict.fromkeys(urls)))
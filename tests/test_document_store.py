@@ -0,0 +1,83 @@
+import pytest
+
+from services.document_store import (
+    SEGMENT_CHARS, Document, DocumentStore, MmapDocumentStore, create_document_store
+)
+
+
+def test_mmap_clear_keeps_views_valid(tmp_path):
+    store = MmapDocumentStore(str(tmp_path))
+    store["cours"] = "Délai de dégagement : 2 heures\n" * 200
+    view = store.view("cours")
+
+    store.clear()
+    store["autre"] = "Nouveau document"
+
+    # L'ancienne projection reste lisible (plus de SIGBUS après clear)
+    assert str(view, 'utf-8').startswith("Délai de dégagement")
+    assert store.passage("autre") == "Nouveau document"
+    assert list(store) == ["autre"]
+
+
+def _large_document():
+    # Plusieurs blocs, avec une occurrence à cheval sur la frontière du premier
+    filler = "Le vol est préparé avec soin. " * (SEGMENT_CHARS // 30)
+    cut = SEGMENT_CHARS - 5 - len(filler)
+    return filler + "x" * cut + "Délai de dégagement : 2 heures\nLe vol suivant."
+
+
+@pytest.mark.parametrize("substring_index", [False, True])
+@pytest.mark.parametrize("kind", ["mmap", "compressed"])
+def test_lookups_read_by_block(tmp_path, monkeypatch, kind, substring_index):
+    document = _large_document()
+    reference = DocumentStore(substring_index=substring_index)
+    reference["cours"] = document
+    store = create_document_store(kind, str(tmp_path), substring_index=substring_index)
+    store["cours"] = document
+
+    def whole_document(*args):
+        raise AssertionError("document lu en entier")
+
+    read = []
+    passage = store._normalized_passage
+
+    def spy(name, start=0, end=None):
+        text = passage(name, start, end)
+        read.append(len(text))
+        return text
+
+    monkeypatch.setattr(store, "normalized", whole_document)
+    monkeypatch.setattr(type(store), "__getitem__", whole_document)
+    monkeypatch.setattr(store, "_normalized_passage", spy)
+
+    for query in ("délai de dégagement", "vol", "absent"):
+        assert store.find_all("cours", query) == reference.find_all("cours", query)
+        assert store.count("cours", query) == reference.count("cours", query)
+        assert store.contains("cours", query) == reference.contains("cours", query)
+    assert store.count("cours", "DELAI DE") == 1
+    assert max(read, default=0) <= SEGMENT_CHARS
+
+
+def test_multi_word_query_matches_across_lines_in_both_modes():
+    document = Document.from_pages([
+        "Consignes de sécurité.\nLe délai\nde dégagement est de 2 heures.",
+        "Rappel : délai de\fdégagement affiché en salle.",
+    ])
+    results = {}
+    for substring_index in (False, True):
+        store = DocumentStore(substring_index=substring_index)
+        store["cours"] = document
+        results[substring_index] = [
+            (hit['start'], hit['end'], hit['page'])
+            for hit in store.search("délai de dégagement", limit=10)
+        ]
+    assert len(results[False]) == 2
+    assert results[True] == results[False]
+    start, end, _ = results[False][0]
+    assert document[start:end] == "délai\nde dégagement"
+
+
+def test_single_word_is_a_substring_with_the_suffix_array():
+    store = DocumentStore(substring_index=True)
+    store["cours"] = "Le dégagement de la piste"
+    assert [(hit['start'], hit['end']) for hit in store.search("gagem")] == [(5, 10)]
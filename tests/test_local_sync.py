@@ -0,0 +1,36 @@
+import sys
+import asyncio
+
+from services.document_store import DocumentStore
+from services.local_sync import LocalFolderSync
+
+
+def test_watch_survives_a_failing_on_change(tmp_path, monkeypatch):
+    # Sans watchfiles : surveillance par polling
+    monkeypatch.setitem(sys.modules, 'watchfiles', None)
+    # Seulement des .txt : l'extracteur PDF par défaut n'est jamais appelé
+    monkeypatch.setattr('services.pdf_extractor.available_backends', lambda: ['pypdf2'])
+    (tmp_path / "a.txt").write_text("Premier cours", encoding='utf-8')
+    changes = []
+
+    async def on_change(result):
+        changes.append(result)
+        if len(changes) == 1:
+            raise RuntimeError("échec du rappel")
+
+    async def scenario():
+        documents = DocumentStore()
+        watch = asyncio.create_task(
+            LocalFolderSync(str(tmp_path)).watch(documents, interval=0.01, on_change=on_change)
+        )
+        while not changes:
+            await asyncio.sleep(0.01)
+        (tmp_path / "b.txt").write_text("Second cours", encoding='utf-8')
+        while len(changes) < 2 and not watch.done():
+            await asyncio.sleep(0.01)
+        watch.cancel()
+        return documents
+
+    documents = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert [change['added'] for change in changes] == [["a.txt"], ["b.txt"]]
+    assert "b.txt" in documents
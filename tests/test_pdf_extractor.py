@@ -0,0 +1,18 @@
+import pytest
+
+from services.pdf_extractor import PdfExtractor, available_backends, resolve_backend
+
+
+def test_auto_picks_an_installed_backend():
+    if not available_backends():
+        pytest.skip("aucun extracteur PDF installé")
+    assert PdfExtractor(max_workers=0, backend='auto').backend in available_backends()
+
+
+def test_unknown_or_missing_backend_is_refused_at_construction(monkeypatch):
+    with pytest.raises(ValueError):
+        PdfExtractor(max_workers=0, backend='inconnu')
+    monkeypatch.setattr('services.pdf_extractor.available_backends', lambda: ['pypdf2'])
+    with pytest.raises(ValueError):
+        PdfExtractor(max_workers=0, backend='pymupdf')
+    assert resolve_backend('auto') == 'pypdf2'